@@ -20,12 +20,11 @@ import linuxfd,signal,select,time
 
 # create special file objects
 efd = linuxfd.eventfd(initval=0,nonBlocking=True)
-sfd = linuxfd.signalfd(signalset={signal.SIGINT},nonBlocking=True)
+sfd = linuxfd.signalfd(signalset={signal.SIGINT},nonBlocking=True,blockSignals=True)
 tfd = linuxfd.timerfd(rtc=True,nonBlocking=True)
 
-# program timer and mask SIGINT
+# program timer (SIGINT was already blocked when the signalfd was created)
 tfd.settime(3,3)
-signal.pthread_sigmask(signal.SIG_SETMASK,{signal.SIGINT})
 
 # create epoll instance and register special files
 epl = select.epoll()
@@ -33,6 +32,30 @@ epl.register(efd.fileno(),select.EPOLLIN)
 epl.register(sfd.fileno(),select.EPOLLIN)
 epl.register(tfd.fileno(),select.EPOLLIN)
 
+# event handlers, called with the current time if their file became readable
+def handle_eventfd(t):
+	# event file descriptor readable: read and exit loop
+	global isrunning
+	print("{0:.3f}: event file received update, exiting...".format(t))
+	efd.read()
+	isrunning = False
+
+def handle_signalfd(t):
+	# signal file descriptor readable: write to event file
+	siginfo = sfd.read()
+	if siginfo["signo"] == signal.SIGINT:
+		print("{0:.3f}: SIGINT received, notifying event file".format(t))
+		efd.write(1)
+
+def handle_timerfd(t):
+	# timer file descriptor readable: display that timer has expired
+	print("{0:.3f}: timer has expired".format(t))
+	tfd.read()
+
+# dispatch table mapping file descriptors to handlers: one dictionary lookup
+# per event instead of a chain of comparisons
+handlers = { efd.fd: handle_eventfd, sfd.fd: handle_signalfd, tfd.fd: handle_timerfd }
+
 # start main loop
 isrunning=True
 print("{0:.3f}: Hello!".format(time.time()))
@@ -42,19 +65,6 @@ while isrunning:
 	t = time.time()
 	# iterate over occurred events
 	for fd,event in events:
-		if fd == efd.fileno() and event & select.EPOLLIN:
-			# event file descriptor readable: read and exit loop
-			print("{0:.3f}: event file received update, exiting...".format(t))
-			efd.read()
-			isrunning = False
-		elif fd == sfd.fileno() and event & select.EPOLLIN:
-			# signal file descriptor readable: write to event file
-			siginfo = sfd.read()
-			if siginfo["signo"] == signal.SIGINT:
-				print("{0:.3f}: SIGINT received, notifying event file".format(t))
-				efd.write(1)
-		elif fd == tfd.fileno() and event & select.EPOLLIN:
-			# timer file descriptor readable: display that timer has expired
-			print("{0:.3f}: timer has expired".format(t))
-			tfd.read()
+		if event & select.EPOLLIN:
+			handlers[fd](t)
 print("{0:.3f}: Goodbye!".format(time.time()))
@@ -24,7 +24,7 @@ import linuxfd,signal,pprint,time,tempfile,os
 efd = linuxfd.eventfd(initval=0,nonBlocking=True)
 print("\ntesting eventfd (fd={})".format(efd.fileno()))
 for i in range(0,3):
-	print("   writing to sempahore")
+	print("   writing to semaphore")
 	efd.write()
 try:
 	while True:
@@ -36,7 +36,7 @@ except BlockingIOError:
 print("\ntesting eventfd (fd={}, mode: counting)".format(efd.fileno()))
 efd = linuxfd.eventfd(initval=0,semaphore=True,nonBlocking=True)
 for i in range(0,3):
-	print("   writing to sempahore")
+	print("   writing to semaphore")
 	efd.write()
 try:
 	while True:
@@ -44,6 +44,10 @@ try:
 		print("   read '{}' from semaphore".format(value))
 except BlockingIOError:
 	print("   semaphore exhausted")
+for i in range(0,3):
+	print("   writing to semaphore")
+	efd.write()
+print("   drained semaphore {} times".format(efd.drain()))
 
 #
 # test signalfd
@@ -15,14 +15,24 @@ Copyright (C) 2014-2020 Frank Abelbeck <frank.abelbeck@googlemail.com>
     You should have received a copy of the GNU Lesser General Public License
     along with linuxfd.  If not, see <http://www.gnu.org/licenses/>."""
 
-from distutils.core import setup, Extension
+try:
+	# setuptools is the way to go; distutils was removed with Python 3.12
+	from setuptools import setup, Extension
+except ImportError:
+	from distutils.core import setup, Extension
 
-gccargs = ["-Wall"]#,"-Wextra"]
+# -O3 comes after the interpreter's own flags and thus takes precedence;
+# further flags (e.g. -march=native for local builds) can be passed via CFLAGS
+gccargs = ["-Wall","-O3"]#,"-Wextra"]
 
 eventfd_c  = Extension("eventfd_c",  sources=["source/eventfd_c.c"],  extra_compile_args=gccargs)
 signalfd_c = Extension("signalfd_c", sources=["source/signalfd_c.c"], extra_compile_args=gccargs)
 timerfd_c  = Extension("timerfd_c",  sources=["source/timerfd_c.c"],  extra_compile_args=gccargs)
 inotify_c  = Extension("inotify_c",  sources=["source/inotify_c.c"],  extra_compile_args=gccargs)
+epoll_c    = Extension("epoll_c",    sources=["source/epoll_c.c"],    extra_compile_args=gccargs)
+# io_uring support depends on the kernel headers: if it fails to build, the
+# package is installed without the uringreactor class
+uring_c    = Extension("uring_c",    sources=["source/uring_c.c"],    extra_compile_args=gccargs, optional=True)
 
 longdescription = """linuxfd provides a Python interface for the Linux system calls 'eventfd',
 'signalfd', 'timerfd' and 'inotify'."""
@@ -40,5 +50,5 @@ setup(
 	package_dir = {"linuxfd":"source"},
 	packages = ["linuxfd"],
 	ext_package = "linuxfd",
-	ext_modules = [eventfd_c,signalfd_c,timerfd_c,inotify_c]
+	ext_modules = [eventfd_c,signalfd_c,timerfd_c,inotify_c,epoll_c,uring_c]
 )
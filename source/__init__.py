@@ -17,18 +17,44 @@ along with linuxfd.  If not, see <http://www.gnu.org/licenses/>.
 Written in Python V3."""
 
 # import helper modules for the syscalls and constants
+# the C extensions are imported eagerly: the IN_* and KIND_* constants below and
+# default arguments like inotify.add(mask=IN_ALL_EVENTS) need them when this
+# module is loaded
 import linuxfd.eventfd_c
 import linuxfd.signalfd_c
 import linuxfd.timerfd_c
 import linuxfd.inotify_c
+import linuxfd.epoll_c
+
+# optional helper module for the uringreactor class: only built if the kernel
+# headers support io_uring
+try:
+	import linuxfd.uring_c
+except ImportError:
+	uring_c = None
 
 # modules used for raising own OSError 
 import errno,os
 
+# modules used for converting timeout values
+import math
+
+# module used for closing file descriptors on garbage collection
+import weakref
+
+# module used for fast attribute access
+import operator
+
+# module used by the reactor classes (threading is imported on first use)
+import select
+
+# modules used by the timerqueue class
+import heapq,time
+
 
 # define constants
 # inotify event mask constants (inotify.add(), inotify.read())
-IN_ACCESS        =  inotify_c.IN_ACCESS
+IN_ACCESS        = inotify_c.IN_ACCESS
 IN_ATTRIB        = inotify_c.IN_ATTRIB
 IN_CLOSE_WRITE   = inotify_c.IN_CLOSE_WRITE
 IN_CLOSE_NOWRITE = inotify_c.IN_CLOSE_NOWRITE
@@ -53,6 +79,29 @@ IN_IGNORED       = inotify_c.IN_IGNORED
 IN_ISDIR         = inotify_c.IN_ISDIR
 IN_Q_OVERFLOW    = inotify_c.IN_Q_OVERFLOW
 IN_UNMOUNT       = inotify_c.IN_UNMOUNT
+# kinds of file descriptors for waitevents()
+KIND_NONE        = epoll_c.KIND_NONE
+KIND_EVENTFD     = epoll_c.KIND_EVENTFD
+KIND_SIGNALFD    = epoll_c.KIND_SIGNALFD
+KIND_TIMERFD     = epoll_c.KIND_TIMERFD
+
+
+def _timeout(timeout):
+	"""Convert a timeout in seconds to milliseconds as expected by epoll_wait();
+negative values (block indefinitely) are mapped to -1."""
+	if timeout < 0:
+		return -1
+	# round up like select.epoll.poll()
+	return int(math.ceil(timeout * 1000))
+
+
+def _close(fd):
+	"""Close a file descriptor, ignoring errors; used as finalizer."""
+	try:
+		os.close(fd)
+	except OSError:
+		pass
+
 
 
 class eventfd:
@@ -63,7 +112,11 @@ Reading and writing this file increments/decrements/resets this counter. As the
 file is pollable via select/poll/epoll it can be used as event notification in
 asynchronous I/O algorithms."""
 	
-	def __init__(self,initval=0,semaphore=False,nonBlocking=False,closeOnExec=False):
+	# fixed set of attributes, no per-instance __dict__; __weakref__ is needed
+	# by weakref.finalize(), which closes the file descriptor
+	__slots__ = ("_fd","_finalizer","_isNonBlocking","_isCloseOnExec","_isSemaphore","_isEdgeTriggered","__weakref__")
+	
+	def __init__(self,initval=0,semaphore=False,nonBlocking=False,closeOnExec=False,edgeTriggered=False):
 		"""Constructor: Initialise an event file descriptor. The descriptor itself can be
 retrieved via the fileno() method.
 
@@ -71,7 +124,8 @@ If the current value of this event file is zero, any reading operation will
 either fail with error EAGAIN (if "nonBlocking" is set to True) or will block.
 
 Args:
-   initval: an integer, range [0;2**64-2], defining an initial counter value.
+   initval: an integer, range [0;2**32-1], defining an initial counter value;
+            values outside this range are clipped.
    semaphore: a boolean; if True, this event file will act like a counting
               semaphore -- every reading operation will decrease the counter by
               one and returns 1; otherwise every reading operation will return
@@ -82,9 +136,18 @@ Args:
                 to close a parent's file descriptors when a child takes control
                 via exec(). Please refer to the documentation on exec() for
                 further details.
+   edgeTriggered: a boolean; if True, this event file is meant to be used as a
+                  wakeup source registered with select.EPOLLIN|select.EPOLLET:
+                  every write() triggers a new edge, so the consumer does not
+                  need to read() on each wakeup and the counter accumulates;
+                  only if the counter is saturated, write() resets it via
+                  drain() and writes again. Requires "nonBlocking" to be True;
+                  cannot be combined with "semaphore", as draining a saturated
+                  semaphore would take one read per token.
 
 Raises:
-   OSError.EINVAL: initval is out of bounds or unsupported value in flags.
+   OSError.EINVAL: initval is not integer-castable, unsupported value in flags or
+                   edgeTriggered combined with a blocking or semaphore file.
    OSError.EMFILE: per-process limit on number of open file descriptors reached.
    OSError.ENFILE: system-wide limit on total number of open files reached.
    OSError.ENODEV: could not mount (internal) anonymous inode device.
@@ -92,40 +155,41 @@ Raises:
 		self._isNonBlocking = bool(nonBlocking)
 		self._isCloseOnExec = bool(closeOnExec)
 		self._isSemaphore   = bool(semaphore)
-		flags = 0
-		if self._isNonBlocking: flags |= eventfd_c.EFD_NONBLOCK
-		if self._isCloseOnExec: flags |= eventfd_c.EFD_CLOEXEC
-		if self._isSemaphore:   flags |= eventfd_c.EFD_SEMAPHORE
-		try:
-			# convert initval to an integer and clip it to uint (assuming 64 bit)
-			initval = min(max(int(initval),0),0xfffffffffffffffe)
-		except:
-			# something went wrong: raise EINVAL (like providing wrong flags)
+		self._isEdgeTriggered = bool(edgeTriggered)
+		if self._isEdgeTriggered and not self._isNonBlocking:
+			# a saturated blocking event file would block write() forever
 			raise OSError(errno.EINVAL,os.strerror(errno.EINVAL))
+		if self._isEdgeTriggered and self._isSemaphore:
+			# draining a saturated semaphore means about 2**64 reads
+			raise OSError(errno.EINVAL,os.strerror(errno.EINVAL))
+		flags = (eventfd_c.EFD_NONBLOCK if self._isNonBlocking else 0) | \
+		        (eventfd_c.EFD_CLOEXEC if self._isCloseOnExec else 0) | \
+		        (eventfd_c.EFD_SEMAPHORE if self._isSemaphore else 0)
+		# initval is converted and clipped to [0;2**32-1] by the C extension
 		self._fd = eventfd_c.eventfd(initval,flags)
-	
-	
-	def __del__(self):
-		"""Destructor: Close the file descriptor."""
-		self.close()
+		# close the file descriptor when this object is garbage collected
+		self._finalizer = weakref.finalize(self,_close,self._fd)
 	
 	
 	def close(self):
 		"""Close the file descriptor."""
-		try:    
-			if self._fd: os.close(self._fd)
-		except: pass
-		self._fd = None
+		self._finalizer() # calls _close() only once
+		self._fd = -1 # like socket.fileno(): methods now fail with EBADF
 	
 	
 	def fileno(self):
 		"""Return the file descriptor of this event file object.
 
 Returns:
-   An integer."""
+   An integer; -1 if the file descriptor was closed."""
 		return self._fd
 	
 	
+	# read-only attribute access to the file descriptor; attrgetter avoids the
+	# Python call frame of a method, which matters in event loop hot paths
+	fd = property(operator.attrgetter("_fd"),doc="The file descriptor of this object (read-only).")
+	
+	
 	def read(self):
 		"""Read the event file and return its value.
 
@@ -145,25 +209,50 @@ Raises:
 		return eventfd_c.eventfd_read(self._fd)
 	
 	
+	def drain(self):
+		"""Read the event file until its counter is exhausted and return the sum of
+all values read.
+
+This is done in a single loop within the C extension. For a counting semaphore,
+this yields the number of times the semaphore could be acquired; as every read()
+takes only one token, the cost grows linearly with the counter value (roughly
+0.2 seconds per million tokens), so draining a large semaphore blocks the calling
+thread for a long time. Otherwise, it equals read(), except that no exception is
+raised if the counter value is zero.
+
+Returns:
+   An integer; zero if the counter value was zero.
+
+Raises:
+   OSError.EINVAL: event file is blocking (the final read would block forever).
+   OSError.EBADF: eventfd file descriptor already closed."""
+		if not self._isNonBlocking:
+			raise OSError(errno.EINVAL,os.strerror(errno.EINVAL))
+		return eventfd_c.eventfd_drain(self._fd)
+	
+	
 	def write(self,value=1):
 		"""Write a value to the event file. The value is added to the counter.
 No value is returned. If the counter will reach its maximum value, the operation
-will either block or raise OSError.EAGAIN (if set to non-blocking behaviour).
+will either block or raise OSError.EAGAIN (if set to non-blocking behaviour). An
+edge-triggered event file instead resets the counter and writes again.
 
 Args:
-   value: an integer in range [0;2**64-2], defaults to one.
+   value: an integer in range [0;2**64-2], defaults to one; values outside
+          this range are clipped.
 
 Raises:
-   OSError.EINVAL: value is out of bounds.
+   OSError.EINVAL: value is not integer-castable.
    OSError.EAGAIN: maximum counter value reached and file is non-blocking.
    OSError.EBADF: eventfd file descriptor already closed."""
+		# value is converted and clipped to [0;2**64-2] by the C extension
 		try:
-			# convert value to an integer and clip it to uint64
-			value = min(max(int(value),0),0xfffffffffffffffe)
-		except:
-			# something went wrong: raise EINVAL (like providing wrong flags)
-			raise OSError(errno.EINVAL,os.strerror(errno.EINVAL))
-		eventfd_c.eventfd_write(self._fd,value)
+			eventfd_c.eventfd_write(self._fd,value)
+		except BlockingIOError:
+			if not self._isEdgeTriggered: raise
+			# counter saturated because nobody reads on wakeup: rewind and retry
+			eventfd_c.eventfd_drain(self._fd)
+			eventfd_c.eventfd_write(self._fd,value)
 	
 	
 	def isSemaphore(self):
@@ -174,6 +263,14 @@ Returns:
 		return self._isSemaphore
 	
 	
+	def isEdgeTriggered(self):
+		"""Return True if this event file is meant for edge-triggered polling.
+
+Returns:
+   A boolean."""
+		return self._isEdgeTriggered
+	
+	
 	def isNonBlocking(self):
 		"""Return True if this event file does not block when no data is available.
 
@@ -199,7 +296,11 @@ caller and becomes readable if triggered. Reading this file returns the pending
 signals for the process. As the file is pollable via select/poll/epoll it can be
 used as an alternative to the usual signal handlers."""
 	
-	def __init__(self,signalset,nonBlocking=False,closeOnExec=False):
+	# fixed set of attributes, no per-instance __dict__; __weakref__ is needed
+	# by weakref.finalize(), which closes the file descriptor
+	__slots__ = ("_fd","_finalizer","_isNonBlocking","_isCloseOnExec","_signalset","__weakref__")
+	
+	def __init__(self,signalset,nonBlocking=False,closeOnExec=False,blockSignals=False):
 		"""Constructor: Initialise a signal file descriptor. The descriptor itself can be
 retrieved via the fileno() method.
 
@@ -216,6 +317,11 @@ Args:
                 to close a parent's file descriptors when a child takes control
                 via exec(). Please refer to the documentation on exec() for
                 further details.
+   blockSignals: a boolean; if True, the signals in signalset are blocked for
+                 the calling thread (like signal.pthread_sigmask(SIG_BLOCK,...))
+                 right before the descriptor is created. Signals have to be
+                 blocked, otherwise they are handled the usual way and never
+                 reach this file. The signal mask is not restored on close().
 
 Raises:
    OSError.EINVAL: invalid signalset.
@@ -225,44 +331,48 @@ Raises:
    OSError.ENOMEM: insufficient memory to create a new singalfd file descriptor."""
 		self._isNonBlocking = bool(nonBlocking)
 		self._isCloseOnExec = bool(closeOnExec)
-		flags = 0
-		if self._isNonBlocking: flags |= signalfd_c.SFD_NONBLOCK
-		if self._isCloseOnExec: flags |= signalfd_c.SFD_CLOEXEC
+		flags = (signalfd_c.SFD_NONBLOCK if self._isNonBlocking else 0) | \
+		        (signalfd_c.SFD_CLOEXEC if self._isCloseOnExec else 0)
 		try:
-			# evaluate signal set
-			self._signalset = tuple([int(i) for i in set(signalset)])
-		except:
+			# keep signal set for signals() and modify(), built in one pass;
+			# the C extension raises EINVAL for invalid signal numbers
+			self._signalset = frozenset(map(int,signalset))
+		except (TypeError,ValueError):
 			# something went wrong: raise EINVAL (like providing wrong flags)
 			raise OSError(errno.EINVAL,os.strerror(errno.EINVAL))
-		self._fd = signalfd_c.signalfd(-1,self._signalset,flags)
-	
-	
-	def __del__(self):
-		"""Destructor: Close the file descriptor."""
-		self.close()
+		self._fd = signalfd_c.signalfd(-1,self._signalset,flags,bool(blockSignals))
+		# close the file descriptor when this object is garbage collected
+		self._finalizer = weakref.finalize(self,_close,self._fd)
 	
 	
 	def close(self):
 		"""Close the file descriptor."""
-		try:    
-			if self._fd: os.close(self._fd)
-		except: pass
-		self._fd = None
+		self._finalizer() # calls _close() only once
+		self._fd = -1 # like socket.fileno(): methods now fail with EBADF
 	
 	
 	def fileno(self):
 		"""Return the file descriptor of this event file object.
 
 Returns:
-   An integer."""
+   An integer; -1 if the file descriptor was closed."""
 		return self._fd
 	
 	
+	# read-only attribute access to the file descriptor; attrgetter avoids the
+	# Python call frame of a method, which matters in event loop hot paths
+	fd = property(operator.attrgetter("_fd"),doc="The file descriptor of this object (read-only).")
+	
+	
 	def modify(self,signalset,nonBlocking,closeOnExec):
 		"""Modify the signalset guarded by this signal file descriptor. The descriptor
 itself can be retrieved via the fileno() method. For details on the arguments,
 please refer to __init__().
 
+The signal mask is only replaced if the signal set actually changed; the flags
+are only adjusted if they changed. Thus calling this method repeatedly with the
+same arguments does not cause any system calls.
+
 Args:
    signalset: a set of valid signal numbers.
    nonBlocking: a boolean.
@@ -272,23 +382,34 @@ Raises:
    OSError.EINVAL: invalid signalset.
    OSError.ENODEV: could not mount (internal) anonymous inode device.
    OSError.EBADF: signalfd file descriptor already closed."""
-		self._isNonBlocking = bool(nonBlocking)
-		self._isCloseOnExec = bool(closeOnExec)
-		flags = 0
-		if self._isNonBlocking: flags |= signalfd_c.SFD_NONBLOCK
-		if self._isCloseOnExec: flags |= signalfd_c.SFD_CLOEXEC
 		try:
-			# evaluate signal set
-			self._signalset = tuple([int(i) for i in set(signalset)])
-		except:
+			# evaluate signal set (cf. __init__())
+			signalset = frozenset(map(int,signalset))
+		except (TypeError,ValueError):
 			# something went wrong: raise EINVAL (like providing wrong flags)
 			raise OSError(errno.EINVAL,os.strerror(errno.EINVAL))
-		self._fd = signalfd_c.signalfd(self._fd,self._signalset,flags)
+		if self._fd < 0:
+			# signalfd(-1,...) would silently create a new file descriptor
+			raise OSError(errno.EBADF,os.strerror(errno.EBADF))
+		if signalset != self._signalset:
+			# replace the signal mask of the existing file descriptor
+			signalfd_c.signalfd(self._fd,signalset,0)
+			self._signalset = signalset
+		# signalfd() ignores the flags when modifying an existing descriptor,
+		# so set O_NONBLOCK and FD_CLOEXEC directly if they changed
+		isNonBlocking = bool(nonBlocking)
+		isCloseOnExec = bool(closeOnExec)
+		if isNonBlocking != self._isNonBlocking:
+			os.set_blocking(self._fd,not isNonBlocking)
+			self._isNonBlocking = isNonBlocking
+		if isCloseOnExec != self._isCloseOnExec:
+			os.set_inheritable(self._fd,not isCloseOnExec)
+			self._isCloseOnExec = isCloseOnExec
 	
 	
 	def read(self):
-		"""Read the signal file and return a dictionary holding information on
-the recently received signal. In addition, the signal is consumed, so that it is
+		"""Read the signal file and return a record holding information on the
+recently received signal. In addition, the signal is consumed, so that it is
 no longer pending for the process.
 
 If multiple signals got caught, multiple calls to read are necessary until all
@@ -296,7 +417,10 @@ pending signals are consumed. When there are no signals pending, this method
 either blocks or fails with error EAGAIN (if in non-blocking mode).
 
 Returns:
-   A dictionary of the following structure (according to signalfd(2)):
+   A siginfo record with the following read-only fields (according to
+   signalfd(2)), accessible as attributes (info.signo) or, like a dictionary,
+   by name (info["signo"]); keys(), values(), items() and get() are supported,
+   too, so dict(info) yields a plain dictionary:
    {
       "signo":   int # Signal number
       "errno":   int # Error number (unused)
@@ -324,11 +448,65 @@ Raises:
 		return signalfd_c.signalfd_read(self._fd)
 	
 	
+	def readMany(self,maxcount=16):
+		"""Read up to "maxcount" pending signals with a single read operation and
+return a list of records holding information on the received signals. All
+returned signals are consumed.
+
+The kernel always fills complete records, so this is equivalent to calling
+read() repeatedly, but needs only one system call for a burst of signals. When
+there are no signals pending, this method either blocks or fails with error
+EAGAIN (if in non-blocking mode).
+
+Args:
+   maxcount: an integer, defining the maximum number of signals to read;
+             default = 16.
+
+Returns:
+   A list of siginfo records; please refer to read() for their structure.
+
+Raises:
+   OSError.EAGAIN: no pending signals.
+   OSError.EWOULDBLOCK: no pending signals.
+   OSError.EINTR: read() call interrupted by a signal.
+   OSError.EBADF: signalfd file descriptor already closed.
+   OSError.ENOMEM: insufficient memory for buffer allocation."""
+		return signalfd_c.signalfd_read_many(self._fd,int(maxcount))
+	
+	
+	def readRaw(self,maxcount=16):
+		"""Read up to "maxcount" pending signals like readMany(), but return the raw
+records as read from the kernel instead of siginfo objects.
+
+Each record is a struct signalfd_siginfo of 128 bytes in native byte order:
+signo (uint32), errno (int32), code (int32), pid (uint32), uid (uint32),
+fd (int32), tid (uint32), band (uint32), overrun (uint32), trapno (uint32),
+status (int32), int (int32), ptr (uint64), utime (uint64), stime (uint64),
+addr (uint64), followed by padding. No object is created per signal, so that a
+burst of signals can be handed to other libraries without copying, e.g.
+numpy.frombuffer() with a matching structured dtype.
+
+Args:
+   maxcount: an integer, defining the maximum number of signals to read;
+             default = 16.
+
+Returns:
+   A bytes object; its length is a multiple of 128.
+
+Raises:
+   OSError.EAGAIN: no pending signals.
+   OSError.EWOULDBLOCK: no pending signals.
+   OSError.EINTR: read() call interrupted by a signal.
+   OSError.EBADF: signalfd file descriptor already closed.
+   OSError.ENOMEM: insufficient memory for buffer allocation."""
+		return signalfd_c.signalfd_read_raw(self._fd,int(maxcount))
+	
+	
 	def signals(self):
 		"""Return the set of guarded signal numbers.
 
 Returns:
-   A set of integers (signal numbers like signal.SIGTERM)."""
+   A frozenset of integers (signal numbers like signal.SIGTERM)."""
 		return self._signalset
 	
 	
@@ -356,6 +534,10 @@ A timer file descriptor is created, which represents a timer and becomes
 readable if this timer expires. Reading this file returns the number of
 expirations that have occurred since the last read operation."""
 	
+	# fixed set of attributes, no per-instance __dict__; __weakref__ is needed
+	# by weakref.finalize(), which closes the file descriptor
+	__slots__ = ("_fd","_finalizer","_isRTC","_isNonBlocking","_isCloseOnExec","__weakref__")
+	
 	def __init__(self,rtc=False,nonBlocking=False,closeOnExec=False):
 		"""Constructor: Initialise a timer file descriptor. The descriptor itself can be
 retrieved via the fileno() method.
@@ -388,33 +570,32 @@ Raises:
 			clockid = timerfd_c.CLOCK_REALTIME
 		else:
 			clockid = timerfd_c.CLOCK_MONOTONIC
-		flags = 0
-		if self._isNonBlocking: flags |= timerfd_c.TFD_NONBLOCK
-		if self._isCloseOnExec: flags |= timerfd_c.TFD_CLOEXEC
+		flags = (timerfd_c.TFD_NONBLOCK if self._isNonBlocking else 0) | \
+		        (timerfd_c.TFD_CLOEXEC if self._isCloseOnExec else 0)
 		self._fd = timerfd_c.timerfd_create(clockid,flags)
-	
-	
-	def __del__(self):
-		"""Destructor: Close the file descriptor."""
-		self.close()
+		# close the file descriptor when this object is garbage collected
+		self._finalizer = weakref.finalize(self,_close,self._fd)
 	
 	
 	def close(self):
 		"""Close the file descriptor."""
-		try:    
-			if self._fd: os.close(self._fd)
-		except: pass
-		self._fd = None
+		self._finalizer() # calls _close() only once
+		self._fd = -1 # like socket.fileno(): methods now fail with EBADF
 	
 	
 	def fileno(self):
 		"""Return the file descriptor of this event file object.
 
 Returns:
-   An integer."""
+   An integer; -1 if the file descriptor was closed."""
 		return self._fd
 	
 	
+	# read-only attribute access to the file descriptor; attrgetter avoids the
+	# Python call frame of a method, which matters in event loop hot paths
+	fd = property(operator.attrgetter("_fd"),doc="The file descriptor of this object (read-only).")
+	
+	
 	def gettime(self):
 		"""Return the current timer setting.
 
@@ -452,13 +633,50 @@ Returns:
 Raises:
    OSError.EINVAL: invalid timer values specified.
    OSError.EBADF: timerfd file descriptor already closed."""
-		if bool(absolute):
-			flags = timerfd_c.TFD_TIMER_ABSTIME
-		else:
-			flags = 0
+		flags = timerfd_c.TFD_TIMER_ABSTIME if absolute else 0
 		return timerfd_c.timerfd_settime(self._fd,flags,value,interval)
 	
 	
+	def gettime_ns(self):
+		"""Return the current timer setting in integer nanoseconds.
+
+Returns:
+    A 2-tuple (value, interval) of integers, analogous to gettime() but in
+    nanoseconds instead of seconds.
+
+Raises:
+   OSError.EBADF: timerfd file descriptor already closed."""
+		return timerfd_c.timerfd_gettime_ns(self._fd)
+	
+	
+	def settime_ns(self,value=0,interval=0,absolute=False):
+		"""Start or stop the timer, with times given in integer nanoseconds.
+
+This is the lossless counterpart of settime(): no floating point conversion is
+involved, so timer values can be derived directly from time.monotonic_ns() or
+time.time_ns() (absolute timer on a monotonic or RTC source, respectively).
+
+Args:
+   value: an integer >= 0 defining the initial expiration time in nanoseconds;
+          if zero (default), the timer is disabled.
+   interval: an integer >= 0 defining the period in nanoseconds of a
+             periodically expiring timer; if zero (default), the timer will only
+             expire once.
+   absolute: a boolean; if True, an absolute timer is started; in this case
+             "value" is interpreted as an absolute clock value; otherwise
+             a relative timer is started (default).
+
+Returns:
+   A 2-tuple (value,interval) of integers; the old timer setting in nanoseconds.
+
+Raises:
+   TypeError: value or interval is not an integer.
+   OSError.EINVAL: invalid timer values specified.
+   OSError.EBADF: timerfd file descriptor already closed."""
+		flags = timerfd_c.TFD_TIMER_ABSTIME if absolute else 0
+		return timerfd_c.timerfd_settime_ns(self._fd,flags,value,interval)
+	
+	
 	def read(self):
 		"""Read the timer file and return an integer denoting the number of
 expirations since the last reading operation.
@@ -505,6 +723,10 @@ An inotify file descriptor is created, which represents an inotify instance.
 Files and directories can be added in order to monitor them. The inotify file
 descriptor becomes readable when such a file alternation event occurs."""
 	
+	# fixed set of attributes, no per-instance __dict__; __weakref__ is needed
+	# by weakref.finalize(), which closes the file descriptor
+	__slots__ = ("_fd","_finalizer","_isNonBlocking","_isCloseOnExec","_wd","_name","_watched","__weakref__")
+	
 	def __init__(self,nonBlocking=False,closeOnExec=False):
 		"""Constructor: Initialise an inotify file descriptor. The descriptor itself can be
 retrieved via the fileno() method.
@@ -529,23 +751,18 @@ Raises:
 		self._isCloseOnExec = bool(closeOnExec)
 		self._wd = dict() # mapping pathnames to watch descriptors
 		self._name = dict() # mapping watch descriptors to pathnames
-		flags = 0
-		if self._isNonBlocking: flags |= inotify_c.IN_NONBLOCK
-		if self._isCloseOnExec: flags |= inotify_c.IN_CLOEXEC
+		self._watched = None # cached result of watchedPaths(); None if outdated
+		flags = (inotify_c.IN_NONBLOCK if self._isNonBlocking else 0) | \
+		        (inotify_c.IN_CLOEXEC if self._isCloseOnExec else 0)
 		self._fd = inotify_c.inotify_init(flags)
-	
-	
-	def __del__(self):
-		"""Destructor: Close the file descriptor."""
-		self.close()
+		# close the file descriptor when this object is garbage collected
+		self._finalizer = weakref.finalize(self,_close,self._fd)
 	
 	
 	def close(self):
 		"""Close the file descriptor."""
-		try:    
-			if self._fd: os.close(self._fd)
-		except: pass
-		self._fd = None
+		self._finalizer() # calls _close() only once
+		self._fd = -1 # like socket.fileno(): methods now fail with EBADF
 
 	
 	
@@ -553,10 +770,15 @@ Raises:
 		"""Return the file descriptor of this event file object.
 
 Returns:
-   An integer."""
+   An integer; -1 if the file descriptor was closed."""
 		return self._fd
 	
 	
+	# read-only attribute access to the file descriptor; attrgetter avoids the
+	# Python call frame of a method, which matters in event loop hot paths
+	fd = property(operator.attrgetter("_fd"),doc="The file descriptor of this object (read-only).")
+	
+	
 	def add(self,pathname,mask=IN_ALL_EVENTS,replace=True):
 		"""Add another file or directory to this inotify instance in order to monitor it.
 
@@ -617,6 +839,47 @@ Raises:
 		wd = inotify_c.inotify_add_watch(self._fd,pathname,mask)
 		self._wd[pathname] = wd
 		self._name[wd] = pathname
+		self._watched = None
+	
+	
+	def addMany(self,pathnames,mask=IN_ALL_EVENTS,replace=True):
+		"""Add several files or directories to this inotify instance at once, e.g. all
+directories of a tree to be monitored recursively.
+
+All watches are added within a single call of the C extension, which does not
+hold the global interpreter lock meanwhile. If adding a watch fails, the other
+pathnames are still added; afterwards the error of the first failed pathname is
+raised. For details on the arguments and possible errors, please refer to add().
+
+Args:
+   pathnames: an iterable of strings.
+   mask: an integer, a bitmask describing file alternation events; defaults to
+         IN_ALL_EVENTS, i.e. watch for all file events.
+   replace: a boolean; if it is True (=default), replace existing masks;
+            otherwise add the specified events to existing masks.
+
+Raises:
+   TypeError: a pathname is not a string.
+   ValueError: a pathname contains a null character.
+   OSError: adding a watch failed (cf. add()); the exception's filename
+            attribute names the first failed pathname."""
+		pathnames = list(pathnames)
+		if bool(replace):
+			mask = mask & ~inotify_c.IN_MASK_ADD # make sure MASK_ADD is not set
+		else:
+			mask = mask | inotify_c.IN_MASK_ADD # make sure MASK_ADD is set
+		error = None
+		for pathname,wd in zip(pathnames,inotify_c.inotify_add_watch_many(self._fd,pathnames,mask)):
+			if wd < 0:
+				# watch could not be added: remember first error (negated errno)
+				if error is None:
+					error = OSError(-wd,os.strerror(-wd),pathname)
+				continue
+			self._wd[pathname] = wd
+			self._name[wd] = pathname
+		self._watched = None
+		if error is not None:
+			raise error
 	
 	
 	def remove(self,pathname):
@@ -628,9 +891,10 @@ Raises:
 		inotify_c.inotify_rm_watch(self._fd,wd)
 		del self._wd[pathname]
 		del self._name[wd]
+		self._watched = None
 	
 	
-	def read(self,buffersize=1024):
+	def read(self,buffersize=16384,mask=None):
 		"""Read the inotify file and return a tuple of events.
 
 If there are no inotify events, this method will either block or fail with error
@@ -638,11 +902,19 @@ EAGAIN if in non-blocking mode.
 
 Args:
    buffersize: an integer, defining the maximum read buffer size in bytes;
-               default = 1024 bytes.
+               default = 16384 bytes, enough for at least 60 events with
+               file names of maximum length.
+   mask: an integer bitmask or None (default); if given, only events with at
+         least one of these bits set are returned, all others are consumed and
+         dropped within the C extension without creating any Python objects;
+         IN_Q_OVERFLOW and IN_IGNORED events are always returned, so that a
+         queue overflow or a removed watch is never missed.
 
 Returns:
    A tuple of 4-tuples (pathname,name,mask,cookie):
-    - "pathname" is the name string previously registered using add();
+    - "pathname" is the name string previously registered using add(); it is
+      None if the event does not refer to a registered watch (e.g. IN_Q_OVERFLOW
+      or IN_IGNORED after the watch was removed);
     - if "pathname" is a directory, the string "name" refers to a file below
       "pathname"; empty string otherwise;
     - "mask" is an integer bitmask describing the occurred events;
@@ -656,11 +928,114 @@ Raises:
    OSError.EBADF: inotify file descriptor already closed.
    OSError.EINVAL: buffer size too small.
    OSError.ENOMEM: insufficient memory for buffer allocation."""
-		eventlist = inotify_c.inotify_read(self._fd,int(buffersize))
-		result = list()
-		for wd,mask,cookie,name in eventlist:
-			result.append((self._name[wd],name,mask,cookie))
-		return tuple(result)
+		# the C extension resolves watch descriptors to pathnames itself
+		if mask is None:
+			return inotify_c.inotify_read(self._fd,int(buffersize),self._name)
+		return inotify_c.inotify_read(self._fd,int(buffersize),self._name,int(mask))
+	
+	
+	def readArrays(self,buffersize=16384,mask=None):
+		"""Read the inotify file and return the events column-wise, i.e. as a structure
+of arrays instead of a tuple of 4-tuples.
+
+Masks and cookies are returned as read-only memoryviews of unsigned 32-bit
+integers: no int object is created per event, and they can be handed to other
+libraries without copying (e.g. numpy.frombuffer(masks,dtype="u4")), so that a
+burst of events can be filtered by mask in a vectorised way.
+
+Args:
+   buffersize: an integer, defining the maximum read buffer size in bytes;
+               default = 16384 bytes.
+   mask: an integer bitmask or None (default) filtering the events, cf. read();
+         IN_Q_OVERFLOW and IN_IGNORED events always pass the filter.
+
+Returns:
+   A 4-tuple (pathnames,names,masks,cookies) of equally long sequences; the
+   i-th items describe the i-th event like the 4-tuples returned by read():
+    - pathnames: a tuple of registered pathnames (None if unknown);
+    - names: a tuple of file name strings;
+    - masks: a memoryview of integer event bitmasks;
+    - cookies: a memoryview of integer cookies.
+
+Raises:
+   ValueError,TypeError: buffersize is not integer-castable.
+   OSError.EAGAIN: no inotify events occurred.
+   OSError.EBADF: inotify file descriptor already closed.
+   OSError.EINVAL: buffer size too small.
+   OSError.ENOMEM: insufficient memory for buffer allocation."""
+		mask = 0xffffffff if mask is None else int(mask)
+		pathnames,names,masks,cookies = inotify_c.inotify_read(self._fd,int(buffersize),self._name,mask,True)
+		return pathnames,names,memoryview(masks).cast("I"),memoryview(cookies).cast("I")
+	
+	
+	def readAll(self,buffersize=16384,mask=None):
+		"""Read the inotify file until no more events are queued and return a tuple
+of all events.
+
+This is the preferred way of reading in non-blocking mode: a burst of events is
+consumed with a single call, saving further wakeups of select/poll/epoll.
+
+Args:
+   buffersize: an integer, defining the maximum read buffer size in bytes per
+               read() system call; default = 16384 bytes.
+   mask: an integer bitmask or None (default) filtering the events, cf. read();
+         IN_Q_OVERFLOW and IN_IGNORED events always pass the filter.
+
+Returns:
+   A tuple of 4-tuples (pathname,name,mask,cookie), cf. read(); empty if no
+   events were queued.
+
+Raises:
+   ValueError,TypeError: buffersize is not integer-castable.
+   OSError.EBADF: inotify file descriptor already closed.
+   OSError.EINVAL: buffer size too small or inotify file is blocking (the
+                   final read would block forever).
+   OSError.ENOMEM: insufficient memory for buffer allocation."""
+		if not self._isNonBlocking:
+			raise OSError(errno.EINVAL,os.strerror(errno.EINVAL))
+		buffersize = int(buffersize)
+		mask = 0xffffffff if mask is None else int(mask)
+		events = list()
+		while True:
+			try:
+				events.extend(inotify_c.inotify_read(self._fd,buffersize,self._name,mask))
+			except BlockingIOError:
+				return tuple(events)
+	
+	
+	def iterEvents(self,buffersize=16384,mask=None):
+		"""Return an iterator over all queued events.
+
+Like readAll(), but events are read in chunks of "buffersize" bytes when needed:
+the events of the first chunk can be processed before the next chunk is read,
+and no list of all events is built. Iteration ends when no more events are
+queued.
+
+Args:
+   buffersize: an integer, defining the maximum read buffer size in bytes per
+               read() system call; default = 16384 bytes.
+   mask: an integer bitmask or None (default) filtering the events, cf. read();
+         IN_Q_OVERFLOW and IN_IGNORED events always pass the filter.
+
+Returns:
+   An iterator yielding 4-tuples (pathname,name,mask,cookie), cf. read().
+
+Raises (on iteration):
+   ValueError,TypeError: buffersize is not integer-castable.
+   OSError.EBADF: inotify file descriptor already closed.
+   OSError.EINVAL: buffer size too small or inotify file is blocking (the
+                   final read would block forever).
+   OSError.ENOMEM: insufficient memory for buffer allocation."""
+		if not self._isNonBlocking:
+			raise OSError(errno.EINVAL,os.strerror(errno.EINVAL))
+		buffersize = int(buffersize)
+		mask = 0xffffffff if mask is None else int(mask)
+		while True:
+			try:
+				events = inotify_c.inotify_read(self._fd,buffersize,self._name,mask)
+			except BlockingIOError:
+				return
+			yield from events
 	
 	
 	def watchedPaths(self):
@@ -668,7 +1043,10 @@ Raises:
 
 Returns:
    A tuple of strings."""
-		return tuple(self._wd.keys())
+		# the tuple is only rebuilt after add() or remove() changed the watches
+		if self._watched is None:
+			self._watched = tuple(self._wd.keys())
+		return self._watched
 	
 	
 	def isNonBlocking(self):
@@ -718,3 +1096,642 @@ Returns:
 		if mask & inotify_c.IN_UNMOUNT: retval.append("IN_UNMOUNT")
 		return tuple(retval)
 
+
+
+def busypoll(epoll,spin,timeout=-1,maxevents=64):
+	"""Wait for events on an epoll instance, spinning for a while before blocking.
+
+The epoll instance is polled without blocking in a tight loop for up to "spin"
+seconds. Only if no event arrived during that time, this function falls back to
+a regular blocking wait. Spinning trades CPU time for latency: it avoids the
+context switch and scheduler wakeup of a blocking epoll_wait(), so it is only
+useful if a CPU core can be dedicated to the event loop.
+
+Args:
+   epoll: a select.epoll object (or any object providing the epoll file
+          descriptor via a fileno() method).
+   spin: a float >= 0 defining the spin budget in seconds.
+   timeout: a float defining the maximum time in seconds to block after the spin
+            phase; if negative (default), block indefinitely.
+   maxevents: an integer, defining the maximum number of events returned;
+              default = 64.
+
+Returns:
+   A list of 2-tuples (fd,events), just like select.epoll.poll().
+
+Raises:
+   OSError.EBADF: epoll file descriptor is not valid.
+   OSError.EINTR: call interrupted by a signal.
+   OSError.EINVAL: epoll file descriptor is not an epoll instance.
+   OSError.ENOMEM: insufficient memory for buffer allocation.
+   ValueError: spin is NaN.
+   OverflowError: spin is larger than 2**31-1 seconds."""
+	return epoll_c.epoll_busywait(epoll.fileno(),int(maxevents),float(spin),_timeout(timeout))
+
+
+def waitevents(epoll,kinds,timeout=-1,maxevents=64):
+	"""Wait for events on an epoll instance and immediately read all ready files.
+
+This fuses the usual two steps of an event loop -- poll, then call read() for
+every ready file -- into a single call: after epoll_wait() returned, the ready
+event, signal and timer files are read within the C extension, so there is only
+one transition between Python and C per loop iteration.
+
+Files have to be registered for select.EPOLLIN with the epoll instance and their
+kind has to be given in "kinds". For every ready file, the value read() would
+have returned is reported. Files not listed in "kinds" are not read; for them
+the epoll event mask is reported instead (kind KIND_NONE). Files that turned out
+not to be readable (e.g. drained concurrently) are skipped. If reading a file
+fails otherwise, an OSError instance is reported as its value; the values read
+from the other ready files are not affected.
+
+Args:
+   epoll: a select.epoll object (or any object providing the epoll file
+          descriptor via a fileno() method).
+   kinds: a dictionary mapping file descriptors to one of the constants
+          linuxfd.KIND_EVENTFD, linuxfd.KIND_SIGNALFD or linuxfd.KIND_TIMERFD.
+   timeout: a float defining the maximum time in seconds to wait; if negative
+            (default), block indefinitely.
+   maxevents: an integer, defining the maximum number of events returned;
+              default = 64.
+
+Returns:
+   A list of 3-tuples (kind,fd,value); "value" is an integer for event and timer
+   files, a siginfo record for signal files (cf. signalfd.read()) and the epoll
+   event mask for files of kind KIND_NONE; an OSError instance if reading the
+   file failed.
+
+Raises:
+   OSError.EBADF: epoll file descriptor is not valid.
+   OSError.EINTR: call interrupted by a signal.
+   OSError.EINVAL: epoll file descriptor is not an epoll instance.
+   OSError.ENOMEM: insufficient memory for buffer allocation."""
+	return epoll_c.epoll_wait_events(epoll.fileno(),kinds,int(maxevents),_timeout(timeout))
+
+
+
+class reactor:
+	"""Class implementing a minimal epoll-based event loop.
+
+Files are registered once together with their kind and a callback. The loop
+itself calls waitevents() repeatedly, i.e. polling and reading all ready event,
+signal and timer files happens within the C extension; the only work done in
+Python per event is the callback invocation. Any other pollable file (sockets,
+pipes, inotify instances...) can be registered with kind KIND_NONE; its callback
+is called with the epoll event mask. If reading a file fails, its callback is
+called with the OSError instance instead. A running loop can be ended from a
+callback or from another thread via stop().
+
+As epoll reports only ready files, the cost of a loop iteration does not depend
+on the number of registered files (unlike select() or poll()), so a reactor
+scales to thousands of files.
+
+As long as no file is registered, the loop does not enter epoll_wait() at all,
+but sleeps until another thread calls add() or stop()."""
+	
+	def __init__(self,maxevents=64):
+		"""Constructor: Initialise an epoll instance and an internal event file used to
+wake up the loop.
+
+Args:
+   maxevents: an integer, defining the maximum number of events handled per
+              loop iteration; default = 64.
+
+Raises:
+   OSError.EMFILE: per-process limit on number of open file descriptors reached.
+   OSError.ENFILE: system-wide limit on total number of open files reached.
+   OSError.ENOMEM: insufficient memory to create the kernel objects."""
+		self._maxevents = int(maxevents)
+		self._isRunning = False
+		self._kinds = {}
+		self._callbacks = {}
+		# condition an idle loop waits on until a file is added or it is stopped;
+		# threading is imported here, so that plain users of the file classes
+		# do not pay for it at import time
+		import threading
+		self._condition = threading.Condition()
+		self._epoll = select.epoll()
+		# internal event file: written by stop() to interrupt a blocking wait
+		self._wakeup = eventfd(nonBlocking=True,closeOnExec=True)
+		self._epoll.register(self._wakeup.fd,select.EPOLLIN)
+		self._kinds[self._wakeup.fd] = KIND_EVENTFD
+	
+	
+	def close(self):
+		"""Close the epoll instance and the internal event file. Registered files are
+not closed."""
+		self._epoll.close()
+		self._wakeup.close()
+	
+	
+	def fileno(self):
+		"""Return the file descriptor of the underlying epoll instance.
+
+Returns:
+   An integer."""
+		return self._epoll.fileno()
+	
+	
+	def add(self,fd,kind,callback,events=select.EPOLLIN):
+		"""Register a file with this reactor.
+
+If the file becomes readable, it is read and "callback" is called with the value
+read() would have returned: an integer for event and timer files, a siginfo record
+for signal files, or the OSError instance if reading failed. Files of kind
+KIND_NONE are not read; their callback receives the epoll event mask and has to
+read the file itself.
+
+Args:
+   fd: a file descriptor (integer) or an object with a fileno() method, like an
+       eventfd, signalfd or timerfd object.
+   kind: one of the constants linuxfd.KIND_EVENTFD, linuxfd.KIND_SIGNALFD,
+         linuxfd.KIND_TIMERFD or linuxfd.KIND_NONE.
+   callback: a callable, accepting one argument.
+   events: an integer, the epoll event mask (e.g. select.EPOLLIN|select.EPOLLOUT)
+           to wait for; only used for files of kind KIND_NONE, the other kinds
+           are always registered for select.EPOLLIN.
+
+Raises:
+   OSError.EBADF: file descriptor is not valid.
+   OSError.EEXIST: file descriptor is already registered.
+   OSError.EINVAL: unsupported kind or callback not callable."""
+		if kind not in (KIND_NONE,KIND_EVENTFD,KIND_SIGNALFD,KIND_TIMERFD) or not callable(callback):
+			raise OSError(errno.EINVAL,os.strerror(errno.EINVAL))
+		if not isinstance(fd,int):
+			fd = fd.fileno()
+		self._epoll.register(fd,events if kind == KIND_NONE else select.EPOLLIN)
+		self._kinds[fd] = kind
+		self._callbacks[fd] = callback
+		# wake up a loop idling because no file was registered
+		with self._condition:
+			self._condition.notify()
+	
+	
+	def remove(self,fd):
+		"""Unregister a file from this reactor.
+
+Args:
+   fd: a file descriptor (integer) or an object with a fileno() method.
+
+Raises:
+   OSError.ENOENT: file descriptor is not registered."""
+		if not isinstance(fd,int):
+			fd = fd.fileno()
+		if fd not in self._callbacks:
+			raise OSError(errno.ENOENT,os.strerror(errno.ENOENT))
+		del self._callbacks[fd]
+		del self._kinds[fd]
+		self._epoll.unregister(fd)
+	
+	
+	def run(self):
+		"""Run the event loop until stop() is called.
+
+Exceptions raised by a callback end the loop and are propagated to the caller.
+
+Raises:
+   OSError.EINTR: call interrupted by a signal.
+   OSError.ENOMEM: insufficient memory for buffer allocation."""
+		# bind everything used per iteration to local names
+		epfd = self._epoll.fileno()
+		kinds = self._kinds
+		callbacks = self._callbacks
+		maxevents = self._maxevents
+		wakeup = self._wakeup.fd
+		wait = epoll_c.epoll_wait_events
+		condition = self._condition
+		self._isRunning = True
+		try:
+			while self._isRunning:
+				if not callbacks:
+					# nothing to wait for: skip epoll_wait() and sleep until
+					# add() or stop() is called
+					with condition:
+						while not callbacks and self._isRunning:
+							condition.wait()
+					continue
+				for kind,fd,value in wait(epfd,kinds,maxevents,-1):
+					# the internal event file was already drained by wait()
+					if fd == wakeup: continue
+					# look up callback for each event: an earlier callback
+					# of this batch might have removed the file
+					callback = callbacks.get(fd)
+					if callback is not None:
+						callback(value)
+		finally:
+			self._isRunning = False
+	
+	
+	def runOnce(self,timeout=-1):
+		"""Wait for events once and call the callbacks of all ready files.
+
+Args:
+   timeout: a float defining the maximum time in seconds to wait; if negative
+            (default), block indefinitely.
+
+Returns:
+   An integer, the number of callbacks called.
+
+Raises:
+   OSError.EINTR: call interrupted by a signal.
+   OSError.ENOMEM: insufficient memory for buffer allocation."""
+		count = 0
+		wakeup = self._wakeup.fd
+		callbacks = self._callbacks
+		for kind,fd,value in epoll_c.epoll_wait_events(self._epoll.fileno(),self._kinds,self._maxevents,_timeout(timeout)):
+			if fd == wakeup: continue
+			callback = callbacks.get(fd)
+			if callback is not None:
+				callback(value)
+				count += 1
+		return count
+	
+	
+	def stop(self):
+		"""Stop a running event loop. The loop returns after the callbacks of the
+current iteration were called. This method can be called from a callback or from
+another thread."""
+		self._isRunning = False
+		self._wakeup.write(1)
+		with self._condition:
+			self._condition.notify()
+	
+	
+	def isRunning(self):
+		"""Return True if the event loop is running.
+
+Returns:
+   A boolean."""
+		return self._isRunning
+
+
+
+class uringreactor:
+	"""Class implementing a minimal io_uring-based event loop.
+
+The interface is the same as the one of the reactor class, but instead of
+waiting for readable files and reading them afterwards, a read operation is
+queued in an io_uring instance for each registered file. A single io_uring_enter()
+call then submits new reads and waits for completed ones, so that a loop
+iteration costs one system call, no matter how many files became readable. The
+first 256 registered files are also put into the ring's registered file table,
+which saves the kernel a file lookup per read.
+Other files (sockets, pipes, inotify instances...) can be registered with kind
+KIND_NONE; they are polled and their callback is called with the poll event mask.
+
+If reading a file fails, its callback is called with the OSError instance instead
+of a value and the file is not read again until it is removed and added again.
+
+With kernelPolling enabled, a kernel thread picks up new reads from the shared
+submission queue, so that a loop iteration whose completions are already there
+costs no system call at all. The thread keeps polling for pollIdle seconds
+without new submissions before it goes to sleep; it then has to be woken up by
+a system call again. This trades a CPU core busy polling for latency.
+
+Requires Linux 5.6 or newer (io_uring read operations)."""
+	
+	def __init__(self,maxevents=64,entries=64,kernelPolling=False,pollIdle=2.0):
+		"""Constructor: Initialise an io_uring instance and an internal event file used
+to wake up the loop.
+
+Args:
+   maxevents: an integer, defining the maximum number of events handled per
+              loop iteration; default = 64.
+   entries: an integer, the size of the submission queue; default = 64; more
+            files can be registered, their reads are submitted in chunks.
+   kernelPolling: a boolean; if True, a kernel thread polls the submission queue.
+   pollIdle: a float >= 0 defining the time in seconds the kernel thread keeps
+             polling without new submissions; default = 2.0.
+
+Raises:
+   OSError.EINVAL: entries is zero or too large, or pollIdle is negative.
+   OSError.EMFILE: per-process limit on number of open file descriptors reached.
+   OSError.ENFILE: system-wide limit on total number of open files reached.
+   OSError.ENOMEM: insufficient memory to create the kernel objects.
+   OSError.ENOSYS: kernel does not support io_uring.
+   OSError.EPERM: io_uring is disabled (sysctl kernel.io_uring_disabled) or
+                  kernelPolling requested by an unprivileged user on Linux
+                  older than 5.11."""
+		if kernelPolling and not pollIdle >= 0:
+			raise OSError(errno.EINVAL,os.strerror(errno.EINVAL))
+		self._maxevents = int(maxevents)
+		self._isRunning = False
+		self._callbacks = {}
+		self._ring = uring_c.ring(int(entries),int(pollIdle * 1000) if kernelPolling else -1)
+		# internal event file: written by stop() to interrupt a blocking wait
+		self._wakeup = eventfd(nonBlocking=True,closeOnExec=True)
+		self._ring.add(self._wakeup.fd,KIND_EVENTFD)
+	
+	
+	def close(self):
+		"""Close the io_uring instance and the internal event file. Registered files are
+not closed."""
+		self._ring.close()
+		self._wakeup.close()
+	
+	
+	def fileno(self):
+		"""Return the file descriptor of the underlying io_uring instance.
+
+Returns:
+   An integer; -1 if the reactor was closed."""
+		return self._ring.fileno()
+	
+	
+	def add(self,fd,kind,callback,events=select.POLLIN):
+		"""Register a file with this reactor.
+
+The file is read as soon as it becomes readable and "callback" is called with the
+value read() would have returned: an integer for event and timer files, a siginfo
+record for signal files. Files of kind KIND_NONE are not read; their callback
+receives the poll event mask and has to read the file itself.
+
+Args:
+   fd: a file descriptor (integer) or an object with a fileno() method, like an
+       eventfd, signalfd or timerfd object.
+   kind: one of the constants linuxfd.KIND_EVENTFD, linuxfd.KIND_SIGNALFD,
+         linuxfd.KIND_TIMERFD or linuxfd.KIND_NONE.
+   callback: a callable, accepting one argument.
+   events: an integer, the poll event mask (e.g. select.POLLIN|select.POLLOUT) to
+           wait for; only used for files of kind KIND_NONE.
+
+Raises:
+   OSError.EBADF: file descriptor is not valid or reactor was closed.
+   OSError.EEXIST: file descriptor is already registered.
+   OSError.EINVAL: unsupported kind or callback not callable."""
+		if kind not in (KIND_NONE,KIND_EVENTFD,KIND_SIGNALFD,KIND_TIMERFD) or not callable(callback):
+			raise OSError(errno.EINVAL,os.strerror(errno.EINVAL))
+		if not isinstance(fd,int):
+			fd = fd.fileno()
+		self._ring.add(fd,kind,events)
+		self._callbacks[fd] = callback
+		# the read is submitted with the next wait; wake up a blocking loop
+		if self._isRunning:
+			self._wakeup.write(1)
+	
+	
+	def addTimer(self,interval,callback):
+		"""Add a periodic timer to this reactor, without creating a timer file.
+
+"callback" is called with the number of expirations since its last call (like
+the value read from a timer file) every "interval" seconds, starting one interval
+from now. On Linux 6.4 and newer, a single multishot timeout operation keeps
+firing in the kernel; older kernels get an absolute timeout per period, so that
+there is no drift either.
+
+Args:
+   interval: a float > 0 defining the period in seconds.
+   callback: a callable, accepting one argument.
+
+Returns:
+   A negative integer identifying the timer, to be passed to remove().
+
+Raises:
+   OSError.EBADF: reactor was closed.
+   OSError.EINVAL: interval not positive or callback not callable."""
+		try:
+			interval = int(round(interval * 1000000000))
+		except (TypeError,ValueError,OverflowError):
+			raise OSError(errno.EINVAL,os.strerror(errno.EINVAL))
+		if interval <= 0 or not callable(callback):
+			raise OSError(errno.EINVAL,os.strerror(errno.EINVAL))
+		key = self._ring.addtimer(interval)
+		self._callbacks[key] = callback
+		if self._isRunning:
+			self._wakeup.write(1)
+		return key
+	
+	
+	def remove(self,fd):
+		"""Unregister a file or timer from this reactor. The pending read of a file is
+cancelled; a value it already read but the loop did not yet dispatch is discarded.
+If the loop is blocked in another thread, it is woken up to submit the cancel
+request.
+
+Args:
+   fd: a file descriptor (integer), an object with a fileno() method or a timer
+       identifier returned by addTimer().
+
+Raises:
+   OSError.ENOENT: file descriptor is not registered."""
+		if not isinstance(fd,int):
+			fd = fd.fileno()
+		if fd not in self._callbacks:
+			raise OSError(errno.ENOENT,os.strerror(errno.ENOENT))
+		self._ring.remove(fd)
+		del self._callbacks[fd]
+		# a loop blocked in another thread submits the cancel request only
+		# after waking up
+		if self._isRunning:
+			self._wakeup.write(1)
+	
+	
+	def run(self):
+		"""Run the event loop until stop() is called.
+
+Exceptions raised by a callback end the loop and are propagated to the caller.
+
+Raises:
+   OSError.EINTR: call interrupted by a signal.
+   OSError.ENOMEM: insufficient memory for buffer allocation."""
+		# bind everything used per iteration to local names
+		callbacks = self._callbacks
+		maxevents = self._maxevents
+		wakeup = self._wakeup.fd
+		wait = self._ring.wait
+		self._isRunning = True
+		try:
+			while self._isRunning:
+				for kind,fd,value in wait(-1,maxevents):
+					# the internal event file was already read by wait()
+					if fd == wakeup: continue
+					# look up callback for each event: an earlier callback
+					# of this batch might have removed the file
+					callback = callbacks.get(fd)
+					if callback is not None:
+						callback(value)
+		finally:
+			self._isRunning = False
+	
+	
+	def runOnce(self,timeout=-1):
+		"""Wait for events once and call the callbacks of all ready files.
+
+Args:
+   timeout: a float defining the maximum time in seconds to wait; if negative
+            (default), block indefinitely.
+
+Returns:
+   An integer, the number of callbacks called.
+
+Raises:
+   OSError.EINTR: call interrupted by a signal.
+   OSError.ENOMEM: insufficient memory for buffer allocation."""
+		count = 0
+		wakeup = self._wakeup.fd
+		callbacks = self._callbacks
+		for kind,fd,value in self._ring.wait(_timeout(timeout),self._maxevents):
+			if fd == wakeup: continue
+			callback = callbacks.get(fd)
+			if callback is not None:
+				callback(value)
+				count += 1
+		return count
+	
+	
+	def stop(self):
+		"""Stop a running event loop. The loop returns after the callbacks of the
+current iteration were called. This method can be called from a callback or from
+another thread."""
+		self._isRunning = False
+		self._wakeup.write(1)
+	
+	
+	def isRunning(self):
+		"""Return True if the event loop is running.
+
+Returns:
+   A boolean."""
+		return self._isRunning
+
+
+if uring_c is None:
+	# extension not built: no io_uring support
+	del uringreactor
+
+
+
+class timerqueue:
+	"""Class to multiplex many logical timers onto a single timer file descriptor.
+
+Timers are kept in a heap ordered by expiration time; the underlying timerfd is
+only armed for the nearest deadline, so an arbitrary number of timers costs one
+file descriptor and one kernel timer. Deadlines are absolute values of the
+monotonic clock (time.monotonic_ns()), so re-arming does not accumulate drift.
+
+The timer file becomes readable when the nearest timer expired. It has to be
+read (e.g. by a reactor or waitevents()) before tick() is called, which then
+calls all due callbacks. With a reactor, this boils down to:
+   queue = linuxfd.timerqueue()
+   loop.add(queue,linuxfd.KIND_TIMERFD,queue.tick)"""
+	
+	def __init__(self,closeOnExec=False):
+		"""Constructor: Initialise the timer file descriptor and an empty timer heap.
+
+Args:
+   closeOnExec: a boolean; if True, the close-on-exec flag for the timer file
+                descriptor is set.
+
+Raises:
+   OSError.EMFILE: per-process limit on number of open file descriptors reached.
+   OSError.ENFILE: system-wide limit on total number of open files reached.
+   OSError.ENODEV: could not mount (internal) anonymous inode device.
+   OSError.ENOMEM: insufficient memory to create a new timer file descriptor."""
+		self._timerfd = timerfd(rtc=False,nonBlocking=True,closeOnExec=closeOnExec)
+		self._heap = [] # entries [deadline,sequence,callback]; callback None if cancelled
+		self._sequence = 0 # tie-breaker: timers with equal deadlines expire in order
+		self._armed = 0 # deadline the timer file is armed for; zero if disarmed
+	
+	
+	def close(self):
+		"""Close the timer file descriptor."""
+		self._timerfd.close()
+	
+	
+	def fileno(self):
+		"""Return the file descriptor of the underlying timer file.
+
+Returns:
+   An integer; -1 if the file descriptor was closed."""
+		return self._timerfd.fileno()
+	
+	
+	def schedule(self,delay,callback):
+		"""Schedule a callback to be called once after a given delay.
+
+Args:
+   delay: a float >= 0 defining the delay in seconds.
+   callback: a callable without arguments.
+
+Returns:
+   A handle identifying this timer, to be passed to cancel().
+
+Raises:
+   OSError.EBADF: timer file descriptor already closed."""
+		return self.scheduleAt(time.monotonic_ns() + int(round(delay * 1000000000)),callback)
+	
+	
+	def scheduleAt(self,deadline,callback):
+		"""Schedule a callback to be called once at a given point in time.
+
+Args:
+   deadline: an integer, a value of time.monotonic_ns(); deadlines in the past
+             expire immediately.
+   callback: a callable without arguments.
+
+Returns:
+   A handle identifying this timer, to be passed to cancel().
+
+Raises:
+   OSError.EBADF: timer file descriptor already closed."""
+		deadline = max(int(deadline),1) # an absolute timer value of zero disarms
+		self._sequence += 1
+		entry = [deadline,self._sequence,callback]
+		heapq.heappush(self._heap,entry)
+		if self._armed == 0 or deadline < self._armed:
+			# new nearest deadline: re-arm the timer file
+			self._timerfd.settime_ns(deadline,0,True)
+			self._armed = deadline
+		return entry
+	
+	
+	def cancel(self,handle):
+		"""Cancel a scheduled timer. Cancelling an expired or already cancelled timer
+has no effect.
+
+Args:
+   handle: a handle returned by schedule() or scheduleAt()."""
+		# lazy deletion: the entry is dropped when it reaches the top of the heap
+		handle[2] = None
+	
+	
+	def tick(self,value=None):
+		"""Call the callbacks of all expired timers and re-arm the timer file for the
+next deadline. Exceptions raised by a callback are propagated to the caller; the
+remaining timers stay scheduled.
+
+Args:
+   value: ignored; allows to use this method as reactor callback directly.
+
+Returns:
+   An integer, the number of callbacks called.
+
+Raises:
+   OSError.EBADF: timer file descriptor already closed."""
+		heap = self._heap
+		count = 0
+		try:
+			now = time.monotonic_ns()
+			while heap and heap[0][0] <= now:
+				callback = heapq.heappop(heap)[2]
+				if callback is not None:
+					count += 1
+					callback()
+		finally:
+			# drop cancelled timers on top, then arm for the nearest deadline
+			while heap and heap[0][2] is None:
+				heapq.heappop(heap)
+			deadline = heap[0][0] if heap else 0
+			if deadline != self._armed:
+				self._timerfd.settime_ns(deadline,0,True)
+				self._armed = deadline
+		return count
+	
+	
+	def __len__(self):
+		"""Return the number of scheduled timers, including cancelled ones not yet
+dropped from the heap.
+
+Returns:
+   An integer."""
+		return len(self._heap)
@@ -0,0 +1,307 @@
+/* This file is part of linuxfd (Python wrapper for eventfd/signalfd/timerfd)
+Copyright (C) 2026 Frank Abelbeck <frank.abelbeck@googlemail.com>
+
+    linuxfd is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    linuxfd is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with linuxfd.  If not, see <http://www.gnu.org/licenses/>.
+*/
+
+#include <Python.h>
+#include <unistd.h>
+#include <string.h> /* definition of strerror() */
+#include <time.h>
+#include <stdint.h> /* definition of uint64_t */
+#include <limits.h> /* definition of INT_MAX */
+#include <errno.h>  /* definition of errno */
+#include <sys/epoll.h>
+#include <sys/signalfd.h>
+
+/* kinds of file descriptors handled by epoll_wait_events() */
+#define KIND_NONE     0 /* unknown: no read, value is the epoll event mask */
+#define KIND_EVENTFD  1 /* eventfd: read counter value (uint64_t) */
+#define KIND_SIGNALFD 2 /* signalfd: read one struct signalfd_siginfo */
+#define KIND_TIMERFD  3 /* timerfd: read number of expirations (uint64_t) */
+
+/* result of a single ready file descriptor in epoll_wait_events() */
+struct ready_event {
+	int fd;
+	uint32_t events;
+	long kind;
+	ssize_t result;
+	int error;
+	union {
+		uint64_t counter;
+		struct signalfd_siginfo siginfo;
+	} value;
+};
+
+/* siginfo constructor imported from signalfd_c */
+typedef PyObject * (*siginfo_new_func)(const struct signalfd_siginfo *);
+static siginfo_new_func siginfo_new = NULL;
+
+/* hint to the CPU that we are spinning (saves power, frees pipeline resources
+   for a sibling hyperthread) */
+#if defined(__x86_64__) || defined(__i386__)
+#define CPU_RELAX() __builtin_ia32_pause()
+#elif defined(__aarch64__) || defined(__arm__)
+#define CPU_RELAX() __asm__ __volatile__("yield")
+#else
+#define CPU_RELAX() do {} while (0)
+#endif
+
+
+/* Python: epoll_busywait(epfd,maxevents,spin,timeout) -> [(fd,events),...]
+   C:      int epoll_wait(int epfd, struct epoll_event *events,
+                          int maxevents, int timeout); */
+static PyObject * _epoll_busywait(PyObject *self, PyObject *args) {
+	/* variable declarations */
+	int epfd;
+	int maxevents;
+	double spin;
+	int timeout;
+	int result;
+	int i;
+	struct epoll_event *events;
+	struct timespec now;
+	struct timespec deadline;
+	PyObject *item;
+	PyObject *data;
+	
+	/* parse the function's arguments: int epfd, int maxevents, double spin, int timeout */
+	if (!PyArg_ParseTuple(args, "iidi", &epfd, &maxevents, &spin, &timeout)) return NULL;
+	
+	/* prepare event buffer (deal with too small or negative values) */
+	if (maxevents < 1) maxevents = 1;
+	if (spin < 0) spin = 0;
+	/* the spin duration is added to a timespec below: reject values that do
+	   not fit into its seconds field */
+	if (spin != spin) {
+		PyErr_SetString(PyExc_ValueError, "spin duration is NaN");
+		return NULL;
+	}
+	if (spin > (double)INT_MAX) {
+		PyErr_SetString(PyExc_OverflowError, "spin duration out of range");
+		return NULL;
+	}
+	events = PyMem_New(struct epoll_event, maxevents);
+	if (events == NULL) return PyErr_NoMemory();
+	
+	Py_BEGIN_ALLOW_THREADS
+	/* spin phase: poll without blocking until an event arrives or the spin
+	   budget is used up; this avoids the scheduler wakeup latency of a
+	   blocking epoll_wait() at the cost of keeping the CPU busy */
+	clock_gettime(CLOCK_MONOTONIC, &deadline);
+	deadline.tv_sec  += (time_t)spin;
+	deadline.tv_nsec += (long int)( 1e9 * (spin - (time_t)spin) );
+	if (deadline.tv_nsec >= 1000000000L) {
+		deadline.tv_sec++;
+		deadline.tv_nsec -= 1000000000L;
+	}
+	for (;;) {
+		result = epoll_wait(epfd, events, maxevents, 0);
+		if (result != 0) break;
+		CPU_RELAX();
+		clock_gettime(CLOCK_MONOTONIC, &now);
+		if (now.tv_sec > deadline.tv_sec || (now.tv_sec == deadline.tv_sec && now.tv_nsec >= deadline.tv_nsec)) break;
+	}
+	/* blocking phase: nothing happened while spinning, fall back to a regular wait */
+	if (result == 0 && timeout != 0) result = epoll_wait(epfd, events, maxevents, timeout);
+	Py_END_ALLOW_THREADS
+	
+	if (result == -1) {
+		/* epoll_wait failed, raise OSError with current error number */
+		PyMem_Free(events); /* thou shalt always free allocated memory! */
+		return PyErr_SetFromErrno(PyExc_OSError);
+	}
+	
+	/* construct list of (fd,events) tuples, just like select.epoll.poll() */
+	data = PyList_New(result);
+	if (data != NULL) {
+		for (i = 0; i < result; i++) {
+			item = Py_BuildValue("(iI)", events[i].data.fd, events[i].events);
+			if (item == NULL) {
+				Py_CLEAR(data);
+				break;
+			}
+			PyList_SET_ITEM(data, i, item);
+		}
+	}
+	PyMem_Free(events); /* thou shalt always free allocated memory! */
+	return data;
+}
+
+
+/* Python: epoll_wait_events(epfd,kinds,maxevents,timeout) -> [(kind,fd,value),...]
+   C:      int epoll_wait(int epfd, struct epoll_event *events,
+                          int maxevents, int timeout);
+           ssize_t read(int fd, void *buf, size_t count); */
+static PyObject * _epoll_wait_events(PyObject *self, PyObject *args) {
+	/* variable declarations */
+	int epfd;
+	PyObject *kinds;
+	int maxevents;
+	int timeout;
+	int result;
+	int n_events;
+	int i;
+	struct epoll_event *events;
+	struct ready_event *ready;
+	PyObject *key;
+	PyObject *kind;
+	PyObject *value;
+	PyObject *item;
+	PyObject *data;
+	
+	/* parse the function's arguments: int epfd, dict kinds (fd -> kind), int maxevents, int timeout */
+	if (!PyArg_ParseTuple(args, "iO!ii", &epfd, &PyDict_Type, &kinds, &maxevents, &timeout)) return NULL;
+	
+	/* make sure the siginfo constructor is available */
+	if (siginfo_new == NULL) {
+		siginfo_new = (siginfo_new_func)PyCapsule_Import("linuxfd.signalfd_c._siginfo_new", 0);
+		if (siginfo_new == NULL) return NULL;
+	}
+	
+	/* prepare buffers (deal with too small or negative values) */
+	if (maxevents < 1) maxevents = 1;
+	events = PyMem_New(struct epoll_event, maxevents);
+	ready = PyMem_New(struct ready_event, maxevents);
+	if (events == NULL || ready == NULL) {
+		PyMem_Free(events);
+		PyMem_Free(ready);
+		return PyErr_NoMemory();
+	}
+	
+	/* call epoll_wait(); catch errors by raising an exception */
+	Py_BEGIN_ALLOW_THREADS
+	result = epoll_wait(epfd, events, maxevents, timeout);
+	Py_END_ALLOW_THREADS
+	if (result == -1) {
+		PyMem_Free(events); /* thou shalt always free allocated memory! */
+		PyMem_Free(ready);
+		return PyErr_SetFromErrno(PyExc_OSError);
+	}
+	n_events = result;
+	
+	/* look up the kind of each ready file descriptor (needs the GIL) */
+	for (i = 0; i < n_events; i++) {
+		ready[i].fd = events[i].data.fd;
+		ready[i].events = events[i].events;
+		ready[i].kind = KIND_NONE;
+		key = PyLong_FromLong(ready[i].fd);
+		if (key == NULL) goto error;
+		kind = PyDict_GetItem(kinds, key); /* borrowed reference */
+		Py_DECREF(key);
+		if (kind != NULL) {
+			ready[i].kind = PyLong_AsLong(kind);
+			if (ready[i].kind == -1 && PyErr_Occurred()) goto error;
+		}
+	}
+	
+	/* read all ready file descriptors in one go */
+	Py_BEGIN_ALLOW_THREADS
+	for (i = 0; i < n_events; i++) {
+		switch (ready[i].kind) {
+			case KIND_EVENTFD:
+			case KIND_TIMERFD:
+				ready[i].result = read(ready[i].fd, &ready[i].value.counter, sizeof(uint64_t));
+				if (ready[i].result != -1 && ready[i].result != sizeof(uint64_t)) {
+					ready[i].result = -1;
+					errno = EIO;
+				}
+				break;
+			case KIND_SIGNALFD:
+				ready[i].result = read(ready[i].fd, &ready[i].value.siginfo, sizeof(struct signalfd_siginfo));
+				if (ready[i].result != -1 && ready[i].result != sizeof(struct signalfd_siginfo)) {
+					ready[i].result = -1;
+					errno = EIO;
+				}
+				break;
+			default:
+				ready[i].result = 0;
+		}
+		ready[i].error = errno;
+	}
+	Py_END_ALLOW_THREADS
+	
+	/* construct list of (kind,fd,value) tuples; file descriptors that were
+	   not readable after all (e.g. drained by another thread) are skipped */
+	data = PyList_New(0);
+	if (data == NULL) goto error;
+	for (i = 0; i < n_events; i++) {
+		if (ready[i].result == -1) {
+			if (ready[i].error == EAGAIN || ready[i].error == EWOULDBLOCK) continue;
+			/* read failed: report the error instead of a value, so that the
+			   values read from the other files are not lost */
+			value = PyObject_CallFunction(PyExc_OSError, "is", ready[i].error, strerror(ready[i].error));
+		} else switch (ready[i].kind) {
+			case KIND_EVENTFD:
+			case KIND_TIMERFD:
+				value = PyLong_FromUnsignedLongLong(ready[i].value.counter);
+				break;
+			case KIND_SIGNALFD:
+				value = siginfo_new(&ready[i].value.siginfo);
+				break;
+			default:
+				ready[i].kind = KIND_NONE;
+				value = PyLong_FromUnsignedLong(ready[i].events);
+		}
+		item = (value == NULL) ? NULL : Py_BuildValue("(liN)", ready[i].kind, ready[i].fd, value);
+		if (item == NULL || PyList_Append(data, item) == -1) {
+			Py_XDECREF(item);
+			Py_DECREF(data);
+			goto error;
+		}
+		Py_DECREF(item);
+	}
+	PyMem_Free(events); /* thou shalt always free allocated memory! */
+	PyMem_Free(ready);
+	return data;
+	
+error:
+	PyMem_Free(events);
+	PyMem_Free(ready);
+	return NULL;
+}
+
+
+static PyMethodDef methods[] = {
+	{ "epoll_busywait",    _epoll_busywait,    METH_VARARGS, NULL },
+	{ "epoll_wait_events", _epoll_wait_events, METH_VARARGS, NULL },
+    { NULL,                NULL,               0,            NULL }
+};
+
+#if PY_MAJOR_VERSION >= 3
+static struct PyModuleDef epollmodule = { PyModuleDef_HEAD_INIT, "epoll_c", NULL, -1, methods };
+#endif
+
+#if PY_MAJOR_VERSION >= 3
+PyMODINIT_FUNC PyInit_epoll_c(void) {
+#else
+void initepoll_c(void) {
+#endif
+	PyObject *m;
+#if PY_MAJOR_VERSION >= 3
+	m = PyModule_Create(&epollmodule);
+#else
+	m = Py_InitModule("epoll_c",methods);
+#endif
+	if (m != NULL) {
+		/* define kinds of file descriptors for epoll_wait_events() */
+		PyModule_AddIntConstant( m, "KIND_NONE",     KIND_NONE );
+		PyModule_AddIntConstant( m, "KIND_EVENTFD",  KIND_EVENTFD );
+		PyModule_AddIntConstant( m, "KIND_SIGNALFD", KIND_SIGNALFD );
+		PyModule_AddIntConstant( m, "KIND_TIMERFD",  KIND_TIMERFD );
+	}
+#if PY_MAJOR_VERSION >= 3
+	return m;
+#endif
+}
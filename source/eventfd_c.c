@@ -16,23 +16,89 @@ Copyright (C) 2014-2020 Frank Abelbeck <frank.abelbeck@googlemail.com>
 */
 
 #include <Python.h>
+#include <errno.h>  /* definition of errno */
+#include <limits.h> /* definition of UINT_MAX */
 #include <sys/eventfd.h>
 
+/* largest value that can be added to an eventfd counter */
+#define EVENTFD_MAX 0xfffffffffffffffeULL
+
+
+/* Convert a Python object to an eventfd counter value like int() would and
+   clip it to the range [0;maximum]. Returns 0 on success. If the object is not
+   integer-castable, OSError.EINVAL is raised and -1 is returned. */
+static int _eventfd_value(PyObject *object, unsigned long long maximum, unsigned long long *value) {
+	/* variable declarations */
+	PyObject *number;
+	long long signedvalue;
+	int overflow;
+	
+	/* fast path: exact ints need no conversion */
+	if (PyLong_CheckExact(object)) {
+		Py_INCREF(object);
+		number = object;
+	} else {
+		number = PyNumber_Long(object);
+		if (number == NULL) {
+			/* not integer-castable: raise EINVAL (like providing wrong flags) */
+			if (PyErr_ExceptionMatches(PyExc_TypeError) ||
+			    PyErr_ExceptionMatches(PyExc_ValueError) ||
+			    PyErr_ExceptionMatches(PyExc_OverflowError)) {
+				PyErr_Clear();
+				errno = EINVAL;
+				PyErr_SetFromErrno(PyExc_OSError);
+			}
+			return -1;
+		}
+	}
+	
+	/* clip to [0;maximum]; values beyond long long are either negative or
+	   beyond the signed range, the latter might still fit an unsigned long long */
+	signedvalue = PyLong_AsLongLongAndOverflow(number, &overflow);
+	if (signedvalue == -1 && overflow == 0 && PyErr_Occurred()) {
+		Py_DECREF(number);
+		return -1;
+	}
+	if (overflow > 0) {
+		*value = PyLong_AsUnsignedLongLong(number);
+		if (*value == (unsigned long long)-1 && PyErr_Occurred()) {
+			if (!PyErr_ExceptionMatches(PyExc_OverflowError)) {
+				Py_DECREF(number);
+				return -1;
+			}
+			PyErr_Clear();
+		}
+		if (*value > maximum) *value = maximum;
+	}
+	else if (overflow < 0 || signedvalue < 0)
+		*value = 0;
+	else if ((unsigned long long)signedvalue > maximum)
+		*value = maximum;
+	else
+		*value = (unsigned long long)signedvalue;
+	Py_DECREF(number);
+	return 0;
+}
+
 
 /* Python: eventfd(initval,flags) -> fd
    C:      int eventfd(unsigned int initval, int flags); */
 static PyObject * _eventfd(PyObject *self, PyObject *args) {
 	/* variable declarations */
-	unsigned int initval;
+	PyObject *pyInitval;
+	unsigned long long initval;
 	int flags;
 	int result;
 	
-	/* parse the function's arguments: unsigned int initval, int flags */
-	if (!PyArg_ParseTuple(args, "Ii", &initval, &flags)) return NULL;
+	/* parse the function's arguments: object initval, int flags */
+	if (!PyArg_ParseTuple(args, "Oi", &pyInitval, &flags)) return NULL;
+	
+	/* convert initval and clip it to unsigned int */
+	if (_eventfd_value(pyInitval, UINT_MAX, &initval) == -1) return NULL;
 	
 	/* call eventfd(); catch errors by raising an exception */
 	Py_BEGIN_ALLOW_THREADS
-	result = eventfd(initval, flags);
+	result = eventfd((unsigned int)initval, flags);
 	Py_END_ALLOW_THREADS
 	if (result == -1) return PyErr_SetFromErrno(PyExc_OSError);
 	
@@ -43,14 +109,19 @@ static PyObject * _eventfd(PyObject *self, PyObject *args) {
 
 /* Python: eventfd_read(fd) -> value
    C:      int eventfd_read(int fd, eventfd_t *value); */
-static PyObject * _eventfd_read(PyObject *self, PyObject *args) {
+static PyObject * _eventfd_read(PyObject *self, PyObject *arg) {
 	/* variable declarations */
-	int fd;
+	long fd;
 	eventfd_t value;
 	int result;
 	
-	/* parse the function's arguments: int fd */
-	if (!PyArg_ParseTuple(args, "i", &fd)) return NULL;
+	/* parse the function's single argument (METH_O, no argument tuple): int fd */
+	fd = PyLong_AsLong(arg);
+	if (fd == -1 && PyErr_Occurred()) return NULL;
+	if (fd < INT_MIN || fd > INT_MAX) {
+		PyErr_SetString(PyExc_OverflowError, "file descriptor out of range");
+		return NULL;
+	}
 	
 	/* call eventfd_read(); catch errors by raising an exception */
 	Py_BEGIN_ALLOW_THREADS
@@ -59,25 +130,56 @@ static PyObject * _eventfd_read(PyObject *self, PyObject *args) {
 	if (result == -1) return PyErr_SetFromErrno(PyExc_OSError);
 	
 	/* everything's fine, return read value */
-	return PyLong_FromLong(value);
+	return PyLong_FromUnsignedLongLong(value);
 }
 
 
 /* Python: eventfd_write(fd,value) -> None
-   C:      int eventfd_write(int fd, eventfd_t value); */
+   C:      int eventfd_write(int fd, eventfd_t value);
+   
+   Since Python 3.7 this function uses the METH_FASTCALL calling convention:
+   the arguments are passed as a C array, so no argument tuple is created and
+   parsed per call. */
+#if PY_VERSION_HEX >= 0x03070000
+#define EVENTFD_WRITE_FLAGS METH_FASTCALL
+static PyObject * _eventfd_write(PyObject *self, PyObject *const *args, Py_ssize_t nargs) {
+#else
+#define EVENTFD_WRITE_FLAGS METH_VARARGS
 static PyObject * _eventfd_write(PyObject *self, PyObject *args) {
+#endif
 	/* variable declarations */
+#if PY_VERSION_HEX >= 0x03070000
+	long fd;
+#else
 	int fd;
-	eventfd_t value;
+#endif
+	PyObject *pyValue;
+	unsigned long long value;
 	int result;
 	
-	/* parse the function's arguments: int fd, uint64_t value */
-	/* uint64_t in Python API? --> unsigned long long = K */
-	if (!PyArg_ParseTuple(args, "iK", &fd, &value)) return NULL;
+	/* parse the function's arguments: int fd, object value */
+#if PY_VERSION_HEX >= 0x03070000
+	if (nargs != 2) {
+		PyErr_Format(PyExc_TypeError, "eventfd_write() takes exactly 2 arguments (%zd given)", nargs);
+		return NULL;
+	}
+	fd = PyLong_AsLong(args[0]);
+	if (fd == -1 && PyErr_Occurred()) return NULL;
+	if (fd < INT_MIN || fd > INT_MAX) {
+		PyErr_SetString(PyExc_OverflowError, "file descriptor out of range");
+		return NULL;
+	}
+	pyValue = args[1];
+#else
+	if (!PyArg_ParseTuple(args, "iO", &fd, &pyValue)) return NULL;
+#endif
+	
+	/* convert value and clip it to the eventfd counter range */
+	if (_eventfd_value(pyValue, EVENTFD_MAX, &value) == -1) return NULL;
 	
 	/* call eventfd_write(); catch errors by raising an exception */
 	Py_BEGIN_ALLOW_THREADS
-	result = eventfd_write(fd,value);
+	result = eventfd_write((int)fd,(eventfd_t)value);
 	Py_END_ALLOW_THREADS
 	if (result == -1) return PyErr_SetFromErrno(PyExc_OSError);
 	
@@ -87,10 +189,46 @@ static PyObject * _eventfd_write(PyObject *self, PyObject *args) {
 }
 
 
+/* Python: eventfd_drain(fd) -> value
+   C:      int eventfd_read(int fd, eventfd_t *value); */
+static PyObject * _eventfd_drain(PyObject *self, PyObject *arg) {
+	/* variable declarations */
+	long fd;
+	eventfd_t value;
+	unsigned long long total = 0;
+	int result;
+	
+	/* parse the function's single argument (METH_O, no argument tuple): int fd */
+	fd = PyLong_AsLong(arg);
+	if (fd == -1 && PyErr_Occurred()) return NULL;
+	if (fd < INT_MIN || fd > INT_MAX) {
+		PyErr_SetString(PyExc_OverflowError, "file descriptor out of range");
+		return NULL;
+	}
+	
+	/* read until the counter is exhausted (EAGAIN) and sum up the values; in
+	   semaphore mode every read() yields 1, otherwise the first read() already
+	   resets the counter; the file has to be non-blocking, else the last read()
+	   would block forever */
+	Py_BEGIN_ALLOW_THREADS
+	for (;;) {
+		result = eventfd_read(fd, &value);
+		if (result == -1) break;
+		total += value;
+	}
+	Py_END_ALLOW_THREADS
+	if (errno != EAGAIN && errno != EWOULDBLOCK) return PyErr_SetFromErrno(PyExc_OSError);
+	
+	/* everything's fine, return accumulated value */
+	return PyLong_FromUnsignedLongLong(total);
+}
+
+
 static PyMethodDef methods[] = {
 	{ "eventfd",       _eventfd,      METH_VARARGS, NULL },
-	{ "eventfd_read",  _eventfd_read, METH_VARARGS, NULL },
-	{ "eventfd_write", _eventfd_write,METH_VARARGS, NULL },
+	{ "eventfd_read",  _eventfd_read, METH_O,       NULL },
+	{ "eventfd_drain", _eventfd_drain,METH_O,       NULL },
+	{ "eventfd_write", (PyCFunction)(void(*)(void))_eventfd_write, EVENTFD_WRITE_FLAGS, NULL },
     { NULL,            NULL,          0,            NULL }
 };
 
@@ -67,6 +67,73 @@ static PyObject * _inotify_add_watch(PyObject *self, PyObject *args) {
 }
 
 
+/* Python: inotify_add_watch_many(fd,pathnames,mask) -> [wd,...]
+   C:      int inotify_add_watch(int fd, const char *pathname, uint32_t mask); */
+static PyObject * _inotify_add_watch_many(PyObject *self, PyObject *args) {
+	/* variable declarations */
+	int fd;
+	uint32_t mask;
+	PyObject *pyPathnames;
+	PyObject *sequence;
+	PyObject *wd;
+	PyObject *data = NULL;
+	Py_ssize_t n_pathnames;
+	Py_ssize_t length;
+	Py_ssize_t i;
+	const char **pathnames;
+	int *wds;
+	
+	/* parse the function's arguments: int fd, sequence of strings pathnames, uint32_t mask */
+	if (!PyArg_ParseTuple(args, "iOI", &fd, &pyPathnames, &mask)) return NULL;
+	sequence = PySequence_Fast(pyPathnames, "pathnames must be iterable");
+	if (sequence == NULL) return NULL;
+	n_pathnames = PySequence_Fast_GET_SIZE(sequence);
+	
+	/* collect the UTF-8 representations of all pathnames while holding the GIL;
+	   they stay valid as long as the sequence holds the string objects */
+	pathnames = PyMem_New(const char *, n_pathnames);
+	wds = PyMem_New(int, n_pathnames);
+	if (pathnames == NULL || wds == NULL) {
+		PyErr_NoMemory();
+		goto cleanup;
+	}
+	for (i = 0; i < n_pathnames; i++) {
+		pathnames[i] = PyUnicode_AsUTF8AndSize(PySequence_Fast_GET_ITEM(sequence, i), &length);
+		if (pathnames[i] == NULL) goto cleanup;
+		if (strlen(pathnames[i]) != (size_t)length) {
+			PyErr_SetString(PyExc_ValueError, "embedded null character");
+			goto cleanup;
+		}
+	}
+	
+	/* call inotify_add_watch() for all pathnames without holding the GIL; a failed
+	   call does not stop the loop, its negated error number is stored instead */
+	Py_BEGIN_ALLOW_THREADS
+	for (i = 0; i < n_pathnames; i++) {
+		wds[i] = inotify_add_watch(fd, pathnames[i], mask);
+		if (wds[i] == -1) wds[i] = -errno;
+	}
+	Py_END_ALLOW_THREADS
+	
+	/* return list of watch descriptors or negated error numbers */
+	data = PyList_New(n_pathnames);
+	for (i = 0; data != NULL && i < n_pathnames; i++) {
+		wd = PyLong_FromLong(wds[i]);
+		if (wd == NULL) {
+			Py_CLEAR(data);
+			break;
+		}
+		PyList_SET_ITEM(data, i, wd);
+	}
+	
+cleanup:
+	PyMem_Free(pathnames); /* thou shalt always free allocated memory! */
+	PyMem_Free(wds);
+	Py_DECREF(sequence);
+	return data;
+}
+
+
 /* Python: inotify_rm_watch(fd,wd)
    C:      int inotify_rm_watch(int fd, int wd); */
 static PyObject * _inotify_rm_watch(PyObject *self, PyObject *args) {
@@ -90,38 +157,123 @@ static PyObject * _inotify_rm_watch(PyObject *self, PyObject *args) {
 }
 
 
-/* Python: inotify_read(fd,size) -> value
+/* size of the stack buffer used by inotify_read(); large enough for a burst of
+   events including names of maximum length (NAME_MAX+1 = 256 bytes), so that
+   the usual calls (default buffer size 16 KiB) do not need to allocate memory */
+#define INOTIFY_STACK_BUFFER 16384
+
+/* decode a file name like os.listdir() does */
+#if PY_MAJOR_VERSION >= 3
+#define NAME_FROM_STRING_AND_SIZE PyUnicode_DecodeFSDefaultAndSize
+#else
+#define NAME_FROM_STRING_AND_SIZE PyString_FromStringAndSize
+#endif
+
+
+/* Build the column-wise (structure of arrays) representation of the events in
+   buffer: a tuple (pathnames,names,masks,cookies), where pathnames and names are
+   tuples and masks and cookies are bytes objects holding n_events native uint32_t
+   values each, so that masks can be processed without creating int objects */
+static PyObject * _inotify_columns(char *buffer, ssize_t length, int n_events, unsigned int filter, PyObject *names) {
+	/* variable declarations */
+	char *pointer;
+	struct inotify_event *event;
+	uint32_t *maskarray;
+	uint32_t *cookiearray;
+	PyObject *pathnames = PyTuple_New(n_events);
+	PyObject *filenames = PyTuple_New(n_events);
+	PyObject *masks = PyBytes_FromStringAndSize(NULL, n_events * sizeof(uint32_t));
+	PyObject *cookies = PyBytes_FromStringAndSize(NULL, n_events * sizeof(uint32_t));
+	PyObject *wd;
+	PyObject *pathname;
+	PyObject *name;
+	int i = 0;
+	
+	if (pathnames == NULL || filenames == NULL || masks == NULL || cookies == NULL) goto error;
+	maskarray = (uint32_t *)PyBytes_AS_STRING(masks);
+	cookiearray = (uint32_t *)PyBytes_AS_STRING(cookies);
+	for (pointer = buffer; pointer < buffer + length; pointer += sizeof(struct inotify_event) + event->len) {
+		/* cast current pointer to an inotify_event structure; skip filtered events */
+		event = (struct inotify_event *)pointer;
+		if (!(event->mask & filter)) continue;
+		/* look up pathname (borrowed reference), None if unknown */
+		wd = PyLong_FromLong(event->wd);
+		if (wd == NULL) goto error;
+		pathname = PyDict_GetItem(names, wd);
+		Py_DECREF(wd);
+		if (pathname == NULL) pathname = Py_None;
+		Py_INCREF(pathname);
+		PyTuple_SET_ITEM(pathnames, i, pathname);
+		/* name is padded with null bytes up to event->len */
+		name = NAME_FROM_STRING_AND_SIZE(event->name, strnlen(event->name, event->len));
+		if (name == NULL) goto error;
+		PyTuple_SET_ITEM(filenames, i, name);
+		maskarray[i] = event->mask;
+		cookiearray[i] = event->cookie;
+		i++; /* keep track of item position */
+	}
+	return Py_BuildValue("(NNNN)", pathnames, filenames, masks, cookies);
+	
+error:
+	Py_XDECREF(pathnames);
+	Py_XDECREF(filenames);
+	Py_XDECREF(masks);
+	Py_XDECREF(cookies);
+	return NULL;
+}
+
+
+/* Python: inotify_read(fd,size,names[,filter[,columns]]) -> ((pathname,name,mask,cookie),...)
+           or, if columns is True, (pathnames,names,masks,cookies)
    C:      ssize_t read(int fd, void *buf, size_t count); */
 static PyObject * _inotify_read(PyObject *self, PyObject *args) {
 	/* variable declarations */
 	int fd;
 	int size;
+	unsigned int filter = 0xffffffff;
+	int columns = 0;
 	int result;
-	int length;
+	ssize_t length;
 	int n_events;
 	char *pointer;
 	char *buffer;
-	struct inotify_event *event;
-	PyObject *data;
-	
-	/* parse the function's argument: int fd, int size */
-	if (!PyArg_ParseTuple(args, "ii", &fd, &size)) return NULL;
-	
-	/* prepare buffer by allocating enough memory
-	   (deal with too small or negative values) */
-	if (size < sizeof(struct inotify_event)) size = sizeof(struct inotify_event);
 	/* taken from the example in man 7 inotify:
 	      "Some systems cannot read integer variables if they are not properly
 	      aligned. On other systems, incorrect alignment may decrease
 	      performance. Hence, the buffer used for reading from the inotify file
-	      descriptor should have the same alignment as struct inotify_event."
-	   Thus use posix_memalign() instead of malloc() */
-	result = posix_memalign((void **)&buffer,sizeof(struct inotify_event),size);
-	if (result != 0) {
-		/* allocation failed, raise OSError with errno set to returned value
-		   (since posix_memalign() won't set it */
-		errno = result;
-		return PyErr_SetFromErrno(PyExc_OSError);
+	      descriptor should have the same alignment as struct inotify_event." */
+	char stackbuffer[INOTIFY_STACK_BUFFER] __attribute__ ((aligned(__alignof__(struct inotify_event))));
+	struct inotify_event *event;
+	PyObject *names;
+	PyObject *wd;
+	PyObject *pathname;
+	PyObject *name;
+	PyObject *item;
+	PyObject *data;
+	
+	/* parse the function's argument: int fd, int size, dict names (wd -> pathname),
+	   optional unsigned int filter (only events with mask & filter != 0 are
+	   returned, so uninteresting events never become Python objects),
+	   optional bool columns (return structure of arrays instead of tuples) */
+	if (!PyArg_ParseTuple(args, "iiO!|Ip", &fd, &size, &PyDict_Type, &names, &filter, &columns)) return NULL;
+	/* queue overflows and removed watches are always reported: a caller
+	   filtering for other events must not miss them */
+	filter |= IN_Q_OVERFLOW | IN_IGNORED;
+	
+	/* prepare buffer (deal with too small or negative values); use the stack
+	   buffer if possible, otherwise allocate enough memory */
+	if (size < (int)sizeof(struct inotify_event)) size = sizeof(struct inotify_event);
+	if (size <= INOTIFY_STACK_BUFFER) {
+		buffer = stackbuffer;
+	} else {
+		/* use posix_memalign() instead of malloc() to ensure proper alignment */
+		result = posix_memalign((void **)&buffer,sizeof(struct inotify_event),size);
+		if (result != 0) {
+			/* allocation failed, raise OSError with errno set to returned value
+			   (since posix_memalign() won't set it */
+			errno = result;
+			return PyErr_SetFromErrno(PyExc_OSError);
+		}
 	}
 	
 	/* call read(); catch OSErrors */
@@ -131,38 +283,56 @@ static PyObject * _inotify_read(PyObject *self, PyObject *args) {
 	
 	if (length == -1) {
 		/* read failed, raise OSError with current error number */
-		free(buffer); /* thou shalt always free allocated memory! */
+		if (buffer != stackbuffer) free(buffer); /* thou shalt always free allocated memory! */
 		return PyErr_SetFromErrno(PyExc_OSError);
 	}
 	
 	/* loop over all events in the buffer (example again adapted from the one in man 7 inotify) */
-	/* first run: determine number of events in order to declare a properly sized PyList */
+	/* first run: determine number of events in order to declare a properly sized tuple */
 	n_events = 0;
 	for (pointer = buffer; pointer < buffer + length; pointer += sizeof(struct inotify_event) + event->len) {
 		/* cast current pointer to an inotify_event structure and increase number of events */
 		event = (struct inotify_event *)pointer;
-		n_events++;
+		if (event->mask & filter) n_events++;
 	}
-	data = PyList_New(n_events);
-	/* second run: populate PyList with the events via PyList_SetItem */
+	if (columns) {
+		data = _inotify_columns(buffer, length, n_events, filter, names);
+		if (buffer != stackbuffer) free(buffer); /* thou shalt always free allocated memory! */
+		return data;
+	}
+	data = PyTuple_New(n_events);
+	/* second run: populate tuple with (pathname,name,mask,cookie) tuples; the
+	   pathname is looked up in the names dictionary, None if unknown (e.g.
+	   IN_Q_OVERFLOW events, or IN_IGNORED events after the watch was removed) */
 	n_events = 0;
-	for (pointer = buffer; pointer < buffer + length; pointer += sizeof(struct inotify_event) + event->len) {
-		/* cast current pointer to an inotify_event structure */
+	for (pointer = buffer; data != NULL && pointer < buffer + length; pointer += sizeof(struct inotify_event) + event->len) {
+		/* cast current pointer to an inotify_event structure; skip filtered events */
 		event = (struct inotify_event *)pointer;
-		/* set a new list item */
-		PyList_SetItem(
-			data,
-			n_events,
-			Py_BuildValue("(i,i,i,s)",
-				event->wd,
-				event->mask,
-				event->cookie,
-				event->len > 0 ? event->name : "" /* nasty, I know... */
-			)
-		);
+		if (!(event->mask & filter)) continue;
+		/* look up pathname (borrowed reference) */
+		wd = PyLong_FromLong(event->wd);
+		if (wd == NULL) {
+			Py_CLEAR(data);
+			break;
+		}
+		pathname = PyDict_GetItem(names, wd);
+		Py_DECREF(wd);
+		if (pathname == NULL) pathname = Py_None;
+		/* name is padded with null bytes up to event->len */
+		name = NAME_FROM_STRING_AND_SIZE(event->name, strnlen(event->name, event->len));
+		if (name == NULL) {
+			Py_CLEAR(data);
+			break;
+		}
+		item = Py_BuildValue("(ONII)", pathname, name, event->mask, event->cookie);
+		if (item == NULL) {
+			Py_CLEAR(data);
+			break;
+		}
+		PyTuple_SET_ITEM(data, n_events, item);
 		n_events++; /* keep track of item position */
 	}
-	free(buffer); /* thou shalt always free allocated memory! */
+	if (buffer != stackbuffer) free(buffer); /* thou shalt always free allocated memory! */
 	return data;
 }
 
@@ -170,6 +340,7 @@ static PyObject * _inotify_read(PyObject *self, PyObject *args) {
 static PyMethodDef methods[] = {
 	{ "inotify_init",      _inotify_init,      METH_VARARGS, NULL },
 	{ "inotify_add_watch", _inotify_add_watch, METH_VARARGS, NULL },
+	{ "inotify_add_watch_many", _inotify_add_watch_many, METH_VARARGS, NULL },
 	{ "inotify_rm_watch",  _inotify_rm_watch,  METH_VARARGS, NULL },
 	{ "inotify_read",      _inotify_read,      METH_VARARGS, NULL },
     { NULL   ,             NULL,               0,            NULL }
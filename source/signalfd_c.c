@@ -16,36 +16,306 @@ Copyright (C) 2014-2020 Frank Abelbeck <frank.abelbeck@googlemail.com>
 */
 
 #include <Python.h>
+#include <structmember.h> /* definition of PyMemberDef and T_* types */
+#include <stddef.h> /* definition of offsetof */
+#include <string.h> /* definition of memcpy */
 #include <unistd.h>
 #include <signal.h>
 #include <errno.h>  /* definition of errno */
+#include <limits.h> /* definition of INT_MAX */
 #include <sys/signalfd.h>
 
 
-/* Python: signalfd(fd,signalset,flags) -> fd
-   C:      int signalfd(int fd, const sigset_t *mask, int flags); */
+/* siginfo: read-only record wrapping a struct signalfd_siginfo; the fields are
+   converted to Python integers only when accessed, either as attribute
+   (info.signo) or, for compatibility with former versions, like a dictionary
+   (info["signo"]) */
+typedef struct {
+	PyObject_HEAD
+	struct signalfd_siginfo info;
+} SiginfoObject;
+
+static PyTypeObject SiginfoType;
+
+#define SIGINFO_MEMBER(name,type,field) \
+	{ name, type, offsetof(SiginfoObject, info) + offsetof(struct signalfd_siginfo, field), READONLY, NULL }
+
+static PyMemberDef siginfo_members[] = {
+	SIGINFO_MEMBER( "signo",   T_UINT,      ssi_signo ),   /* Signal number */
+	SIGINFO_MEMBER( "errno",   T_INT,       ssi_errno ),   /* Error number (unused) */
+	SIGINFO_MEMBER( "code",    T_INT,       ssi_code ),    /* Signal code */
+	SIGINFO_MEMBER( "pid",     T_UINT,      ssi_pid ),     /* PID of sender */
+	SIGINFO_MEMBER( "uid",     T_UINT,      ssi_uid ),     /* Real UID of sender */
+	SIGINFO_MEMBER( "fd",      T_INT,       ssi_fd ),      /* File descriptor (SIGIO) */
+	SIGINFO_MEMBER( "tid",     T_UINT,      ssi_tid ),     /* Kernel timer ID (POSIX timers) */
+	SIGINFO_MEMBER( "band",    T_UINT,      ssi_band ),    /* Band event (SIGIO) */
+	SIGINFO_MEMBER( "overrun", T_UINT,      ssi_overrun ), /* POSIX timer overrun count */
+	SIGINFO_MEMBER( "trapno",  T_UINT,      ssi_trapno ),  /* Trap number that caused signal */
+	SIGINFO_MEMBER( "status",  T_INT,       ssi_status ),  /* Exit status or signal (SIGCHLD) */
+	SIGINFO_MEMBER( "int",     T_INT,       ssi_int ),     /* Integer sent by sigqueue(3) */
+	SIGINFO_MEMBER( "ptr",     T_ULONGLONG, ssi_ptr ),     /* Pointer sent by sigqueue(3) */
+	SIGINFO_MEMBER( "utime",   T_ULONGLONG, ssi_utime ),   /* User CPU time consumed (SIGCHLD) */
+	SIGINFO_MEMBER( "stime",   T_ULONGLONG, ssi_stime ),   /* System CPU time consumed (SIGCHLD) */
+	SIGINFO_MEMBER( "addr",    T_ULONGLONG, ssi_addr ),    /* Address that generated signal */
+	{ NULL }
+};
+
+#define SIGINFO_N_MEMBERS ((Py_ssize_t)(sizeof(siginfo_members) / sizeof(PyMemberDef) - 1))
+
+/* tuple of interned member names, used as dictionary keys */
+static PyObject *siginfo_keys = NULL;
+
+
+/* construct a siginfo object from a struct signalfd_siginfo */
+static PyObject * _siginfo_new(const struct signalfd_siginfo *value) {
+	SiginfoObject *object;
+	object = PyObject_New(SiginfoObject, &SiginfoType);
+	if (object == NULL) return NULL;
+	memcpy(&object->info, value, sizeof(struct signalfd_siginfo));
+	return (PyObject *)object;
+}
+
+
+/* look up the member definition for a key; returns NULL if key is unknown */
+static PyMemberDef * _siginfo_member(PyObject *key) {
+	Py_ssize_t i;
+	int result;
+	/* keys are interned, so usually the identity check already succeeds */
+	for (i = 0; i < SIGINFO_N_MEMBERS; i++)
+		if (PyTuple_GET_ITEM(siginfo_keys, i) == key) return &siginfo_members[i];
+	for (i = 0; i < SIGINFO_N_MEMBERS; i++) {
+		result = PyObject_RichCompareBool(PyTuple_GET_ITEM(siginfo_keys, i), key, Py_EQ);
+		if (result == 1) return &siginfo_members[i];
+		if (result == -1) PyErr_Clear(); /* unhashable/uncomparable key: not found */
+	}
+	return NULL;
+}
+
+
+/* Python: info[key] -> value */
+static PyObject * _siginfo_subscript(PyObject *self, PyObject *key) {
+	PyMemberDef *member = _siginfo_member(key);
+	if (member == NULL) {
+		PyErr_SetObject(PyExc_KeyError, key);
+		return NULL;
+	}
+	return PyMember_GetOne((char *)self, member);
+}
+
+
+/* Python: len(info) -> number of fields */
+static Py_ssize_t _siginfo_length(PyObject *self) {
+	return SIGINFO_N_MEMBERS;
+}
+
+
+/* Python: key in info -> bool */
+static int _siginfo_contains(PyObject *self, PyObject *key) {
+	return _siginfo_member(key) != NULL;
+}
+
+
+/* Python: iter(info) -> iterator over keys, like a dictionary */
+static PyObject * _siginfo_iter(PyObject *self) {
+	return PyObject_GetIter(siginfo_keys);
+}
+
+
+/* Python: info.keys() -> tuple of field names */
+static PyObject * _siginfo_keys(PyObject *self, PyObject *unused) {
+	Py_INCREF(siginfo_keys);
+	return siginfo_keys;
+}
+
+
+/* Python: info.values() -> list of field values */
+static PyObject * _siginfo_values(PyObject *self, PyObject *unused) {
+	Py_ssize_t i;
+	PyObject *item;
+	PyObject *data = PyList_New(SIGINFO_N_MEMBERS);
+	if (data == NULL) return NULL;
+	for (i = 0; i < SIGINFO_N_MEMBERS; i++) {
+		item = PyMember_GetOne((char *)self, &siginfo_members[i]);
+		if (item == NULL) {
+			Py_DECREF(data);
+			return NULL;
+		}
+		PyList_SET_ITEM(data, i, item);
+	}
+	return data;
+}
+
+
+/* Python: info.items() -> list of (name,value) tuples */
+static PyObject * _siginfo_items(PyObject *self, PyObject *unused) {
+	Py_ssize_t i;
+	PyObject *item;
+	PyObject *data = PyList_New(SIGINFO_N_MEMBERS);
+	if (data == NULL) return NULL;
+	for (i = 0; i < SIGINFO_N_MEMBERS; i++) {
+		item = PyMember_GetOne((char *)self, &siginfo_members[i]);
+		if (item != NULL) item = Py_BuildValue("(ON)", PyTuple_GET_ITEM(siginfo_keys, i), item);
+		if (item == NULL) {
+			Py_DECREF(data);
+			return NULL;
+		}
+		PyList_SET_ITEM(data, i, item);
+	}
+	return data;
+}
+
+
+/* Python: info.get(key,default=None) -> value */
+static PyObject * _siginfo_get(PyObject *self, PyObject *args) {
+	PyObject *key;
+	PyObject *defaultvalue = Py_None;
+	PyMemberDef *member;
+	if (!PyArg_ParseTuple(args, "O|O", &key, &defaultvalue)) return NULL;
+	member = _siginfo_member(key);
+	if (member == NULL) {
+		Py_INCREF(defaultvalue);
+		return defaultvalue;
+	}
+	return PyMember_GetOne((char *)self, member);
+}
+
+
+/* Python: repr(info) -> "siginfo(signo=..., ...)" */
+static PyObject * _siginfo_repr(PyObject *self) {
+	SiginfoObject *object = (SiginfoObject *)self;
+	char buffer[512];
+	PyOS_snprintf(buffer, sizeof(buffer),
+		"siginfo(signo=%u, errno=%d, code=%d, pid=%u, uid=%u, fd=%d, tid=%u, "
+		"band=%u, overrun=%u, trapno=%u, status=%d, int=%d, ptr=%llu, "
+		"utime=%llu, stime=%llu, addr=%llu)",
+		object->info.ssi_signo, object->info.ssi_errno, object->info.ssi_code,
+		object->info.ssi_pid, object->info.ssi_uid, object->info.ssi_fd,
+		object->info.ssi_tid, object->info.ssi_band, object->info.ssi_overrun,
+		object->info.ssi_trapno, object->info.ssi_status, object->info.ssi_int,
+		(unsigned long long)object->info.ssi_ptr,
+		(unsigned long long)object->info.ssi_utime,
+		(unsigned long long)object->info.ssi_stime,
+		(unsigned long long)object->info.ssi_addr);
+#if PY_MAJOR_VERSION >= 3
+	return PyUnicode_FromString(buffer);
+#else
+	return PyString_FromString(buffer);
+#endif
+}
+
+
+static PyMethodDef siginfo_methods[] = {
+	{ "keys",   _siginfo_keys,   METH_NOARGS,  NULL },
+	{ "values", _siginfo_values, METH_NOARGS,  NULL },
+	{ "items",  _siginfo_items,  METH_NOARGS,  NULL },
+	{ "get",    _siginfo_get,    METH_VARARGS, NULL },
+    { NULL,     NULL,            0,            NULL }
+};
+
+static PyMappingMethods siginfo_as_mapping = {
+	.mp_length    = _siginfo_length,
+	.mp_subscript = _siginfo_subscript,
+};
+
+static PySequenceMethods siginfo_as_sequence = {
+	.sq_contains = _siginfo_contains,
+};
+
+static PyTypeObject SiginfoType = {
+	PyVarObject_HEAD_INIT(NULL, 0)
+	.tp_name        = "linuxfd.signalfd_c.siginfo",
+	.tp_basicsize   = sizeof(SiginfoObject),
+	.tp_dealloc     = (destructor)PyObject_Del,
+	.tp_repr        = _siginfo_repr,
+	.tp_as_sequence = &siginfo_as_sequence,
+	.tp_as_mapping  = &siginfo_as_mapping,
+	.tp_flags       = Py_TPFLAGS_DEFAULT,
+	.tp_doc         = "Information on a signal read from a signal file descriptor.",
+	.tp_iter        = _siginfo_iter,
+	.tp_methods     = siginfo_methods,
+	.tp_members     = siginfo_members,
+};
+
+
+/* Fill a signal set with the signal numbers of a Python iterable (set, tuple,
+   list...); items are converted like int() would. Returns 0 on success. If the
+   object is not iterable or an item is not a valid signal number, OSError.EINVAL
+   is raised and -1 is returned. */
+static int _signalfd_sigset(PyObject *object, sigset_t *mask) {
+	/* variable declarations */
+	PyObject *iterator;
+	PyObject *item;
+	PyObject *number;
+	long signo;
+	
+	sigemptyset(mask);
+	iterator = PyObject_GetIter(object);
+	if (iterator == NULL) goto invalid;
+	while ((item = PyIter_Next(iterator)) != NULL) {
+		/* fast path: exact ints need no conversion */
+		if (PyLong_CheckExact(item)) {
+			number = item;
+		} else {
+			number = PyNumber_Long(item);
+			Py_DECREF(item);
+			if (number == NULL) break;
+		}
+		signo = PyLong_AsLong(number);
+		Py_DECREF(number);
+		if (signo == -1 && PyErr_Occurred()) break;
+		/* if -1 is returned, the item did not specify a valid signal number;
+		   errno will be set to EINVAL, thus OSError is raised */
+		if (signo < 1 || signo > INT_MAX || sigaddset(mask, (int)signo) == -1) {
+			Py_DECREF(iterator);
+			errno = EINVAL;
+			PyErr_SetFromErrno(PyExc_OSError);
+			return -1;
+		}
+	}
+	Py_DECREF(iterator);
+	if (!PyErr_Occurred()) return 0;
+	
+invalid:
+	/* not iterable or item not integer-castable: raise EINVAL */
+	if (PyErr_ExceptionMatches(PyExc_TypeError) ||
+	    PyErr_ExceptionMatches(PyExc_ValueError) ||
+	    PyErr_ExceptionMatches(PyExc_OverflowError)) {
+		PyErr_Clear();
+		errno = EINVAL;
+		PyErr_SetFromErrno(PyExc_OSError);
+	}
+	return -1;
+}
+
+
+/* Python: signalfd(fd,signalset,flags[,block]) -> fd
+   C:      int signalfd(int fd, const sigset_t *mask, int flags);
+           int pthread_sigmask(int how, const sigset_t *set, sigset_t *oldset); */
 static PyObject * _signalfd(PyObject *self, PyObject *args) {
 	/* variable declarations */
 	int fd;
 	int flags;
+	int block = 0;
 	int result;
 	sigset_t mask;
-	int setsize;
-	int i;
 	
-	/* problem: signalset is a tuple of variable length 
-	   => parse it as generic object and check if a tuple was received */
+	/* problem: signalset is an iterable of variable length 
+	   => parse it as generic object and iterate over it */
 	PyObject* pySignalSet;
-	if (!PyArg_ParseTuple(args, "iOi", &fd, &pySignalSet, &flags) || !PyTuple_Check(pySignalSet)) return NULL;
-	
-	/* iterate over python tuple and add signals to empty signal set */
-	result = sigemptyset(&mask);
-	setsize = PyTuple_Size(pySignalSet);
-	for (i = 0; i < setsize; i++) {
-		result = sigaddset(&mask,(int)PyLong_AsLong(PyTuple_GetItem(pySignalSet,i)));
-		/* if -1 is returned, the item did not specify a valid signal number
-		   errno will be set to EINVAL, thus OSError is raised */
-		if (result == -1) return PyErr_SetFromErrno(PyExc_OSError);
+	if (!PyArg_ParseTuple(args, "iOi|p", &fd, &pySignalSet, &flags, &block)) return NULL;
+	if (_signalfd_sigset(pySignalSet, &mask) == -1) return NULL;
+	
+	/* if requested, block the signals for the calling thread before creating
+	   the descriptor, so that none of them is delivered the usual way in between;
+	   pthread_sigmask() returns an error number instead of setting errno */
+	if (block) {
+		Py_BEGIN_ALLOW_THREADS
+		result = pthread_sigmask(SIG_BLOCK, &mask, NULL);
+		Py_END_ALLOW_THREADS
+		if (result != 0) {
+			errno = result;
+			return PyErr_SetFromErrno(PyExc_OSError);
+		}
 	}
 	
 	/* call signalfd(); catch errors by raising an exception */
@@ -61,15 +331,20 @@ static PyObject * _signalfd(PyObject *self, PyObject *args) {
 
 /* Python: signalfd_read(fd) -> value
    C:      int signalfd_read(int fd, eventfd_t *value); */
-static PyObject * _signalfd_read(PyObject *self, PyObject *args) {
+static PyObject * _signalfd_read(PyObject *self, PyObject *arg) {
 	/* variable declarations */
-	int fd;
+	long fd;
 	struct signalfd_siginfo value;
 	int result;
-	PyObject *dictvalue;
+	PyObject *infovalue;
 	
-	/* parse the function's arguments: int fd */
-	if (!PyArg_ParseTuple(args, "i", &fd)) return NULL;
+	/* parse the function's single argument (METH_O, no argument tuple): int fd */
+	fd = PyLong_AsLong(arg);
+	if (fd == -1 && PyErr_Occurred()) return NULL;
+	if (fd < INT_MIN || fd > INT_MAX) {
+		PyErr_SetString(PyExc_OverflowError, "file descriptor out of range");
+		return NULL;
+	}
 	
 	/* call read; catch errors by raising an exception */
 	Py_BEGIN_ALLOW_THREADS
@@ -85,36 +360,128 @@ static PyObject * _signalfd_read(PyObject *self, PyObject *args) {
 		return PyErr_SetFromErrno(PyExc_OSError);
 	}
 	
-	/* construct signal dictionary */
-	dictvalue = Py_BuildValue(
-		"{s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i}",
-		"signo",   value.ssi_signo,
-		"errno",   value.ssi_errno,
-		"code",    value.ssi_code,
-		"pid",     value.ssi_pid,
-		"uid",     value.ssi_uid,
-		"fd",      value.ssi_fd,
-		"tid",     value.ssi_tid,
-		"band",    value.ssi_band,
-		"overrun", value.ssi_overrun,
-		"trapno",  value.ssi_trapno,
-		"status",  value.ssi_status,
-		"int",     value.ssi_int,
-		"ptr",     value.ssi_ptr,
-		"utime",   value.ssi_utime,
-		"stime",   value.ssi_stime,
-		"addr",    value.ssi_addr
-	);
+	/* construct signal information record */
+	infovalue = _siginfo_new(&value);
 
 	/* everything's fine, return read value */
-	return dictvalue;
+	return infovalue;
+}
+
+
+/* number of records that signalfd_read_many() reads into a stack buffer
+   (16 * 128 bytes); only larger requests need to allocate memory */
+#define SIGNALFD_STACK_BUFFER 16
+
+
+/* Python: signalfd_read_many(fd,maxcount) -> list of values
+   C:      ssize_t read(int fd, void *buf, size_t count); */
+static PyObject * _signalfd_read_many(PyObject *self, PyObject *args) {
+	/* variable declarations */
+	int fd;
+	int maxcount;
+	struct signalfd_siginfo stackbuffer[SIGNALFD_STACK_BUFFER];
+	struct signalfd_siginfo *buffer;
+	ssize_t result;
+	int n_signals;
+	int i;
+	PyObject *item;
+	PyObject *data;
+	
+	/* parse the function's arguments: int fd, int maxcount */
+	if (!PyArg_ParseTuple(args, "ii", &fd, &maxcount)) return NULL;
+	
+	/* prepare a buffer for up to maxcount records (deal with too small values);
+	   the kernel fills as many complete records as are pending with one read();
+	   use the stack buffer if possible, otherwise allocate enough memory */
+	if (maxcount < 1) maxcount = 1;
+	if (maxcount <= SIGNALFD_STACK_BUFFER) {
+		buffer = stackbuffer;
+	} else {
+		buffer = PyMem_New(struct signalfd_siginfo, maxcount);
+		if (buffer == NULL) return PyErr_NoMemory();
+	}
+	
+	/* call read(); catch errors by raising an exception */
+	Py_BEGIN_ALLOW_THREADS
+	result = read(fd, buffer, maxcount * sizeof(struct signalfd_siginfo));
+	Py_END_ALLOW_THREADS
+	if (result == -1) {
+		/* read failed, raise OSError with current error number */
+		if (buffer != stackbuffer) PyMem_Free(buffer); /* thou shalt always free allocated memory! */
+		return PyErr_SetFromErrno(PyExc_OSError);
+	} else if (result % sizeof(struct signalfd_siginfo) != 0) {
+		/* read succeeded, but returned a partial record;
+		   perhaps interrupted, raise an I/O error */
+		if (buffer != stackbuffer) PyMem_Free(buffer);
+		errno = EIO;
+		return PyErr_SetFromErrno(PyExc_OSError);
+	}
+	
+	/* construct a list of signal information records, one per record read */
+	n_signals = result / sizeof(struct signalfd_siginfo);
+	data = PyList_New(n_signals);
+	if (data != NULL) {
+		for (i = 0; i < n_signals; i++) {
+			item = _siginfo_new(&buffer[i]);
+			if (item == NULL) {
+				Py_CLEAR(data);
+				break;
+			}
+			PyList_SET_ITEM(data, i, item);
+		}
+	}
+	if (buffer != stackbuffer) PyMem_Free(buffer); /* thou shalt always free allocated memory! */
+	return data;
+}
+
+
+/* Python: signalfd_read_raw(fd,maxcount) -> bytes
+   C:      ssize_t read(int fd, void *buf, size_t count); */
+static PyObject * _signalfd_read_raw(PyObject *self, PyObject *args) {
+	/* variable declarations */
+	int fd;
+	int maxcount;
+	ssize_t result;
+	PyObject *data;
+	
+	/* parse the function's arguments: int fd, int maxcount */
+	if (!PyArg_ParseTuple(args, "ii", &fd, &maxcount)) return NULL;
+	
+	/* read up to maxcount records straight into a new bytes object; it is not
+	   shared yet, so it may be filled without holding the GIL */
+	if (maxcount < 1) maxcount = 1;
+	if ((size_t)maxcount > PY_SSIZE_T_MAX / sizeof(struct signalfd_siginfo)) return PyErr_NoMemory();
+	data = PyBytes_FromStringAndSize(NULL, (Py_ssize_t)maxcount * sizeof(struct signalfd_siginfo));
+	if (data == NULL) return NULL;
+	
+	/* call read(); catch errors by raising an exception */
+	Py_BEGIN_ALLOW_THREADS
+	result = read(fd, PyBytes_AS_STRING(data), maxcount * sizeof(struct signalfd_siginfo));
+	Py_END_ALLOW_THREADS
+	if (result == -1) {
+		/* read failed, raise OSError with current error number */
+		Py_DECREF(data);
+		return PyErr_SetFromErrno(PyExc_OSError);
+	} else if (result % sizeof(struct signalfd_siginfo) != 0) {
+		/* read succeeded, but returned a partial record;
+		   perhaps interrupted, raise an I/O error */
+		Py_DECREF(data);
+		errno = EIO;
+		return PyErr_SetFromErrno(PyExc_OSError);
+	}
+	
+	/* shrink the bytes object to the records actually read */
+	if (result != PyBytes_GET_SIZE(data) && _PyBytes_Resize(&data, result) == -1) return NULL;
+	return data;
 }
 
 
 static PyMethodDef methods[] = {
-	{ "signalfd",       _signalfd,      METH_VARARGS, NULL },
-	{ "signalfd_read",  _signalfd_read, METH_VARARGS, NULL },
-    { NULL,             NULL,           0,            NULL }
+	{ "signalfd",           _signalfd,           METH_VARARGS, NULL },
+	{ "signalfd_read",      _signalfd_read,      METH_O,       NULL },
+	{ "signalfd_read_many", _signalfd_read_many, METH_VARARGS, NULL },
+	{ "signalfd_read_raw",  _signalfd_read_raw,  METH_VARARGS, NULL },
+    { NULL,                 NULL,                0,            NULL }
 };
 
 #if PY_MAJOR_VERSION >= 3
@@ -127,6 +494,21 @@ PyMODINIT_FUNC PyInit_signalfd_c(void) {
 void initsignalfd_c(void) {
 #endif
 	PyObject *m;
+	Py_ssize_t i;
+	
+	/* prepare siginfo type and its tuple of interned keys */
+	m = NULL;
+	if (PyType_Ready(&SiginfoType) < 0) goto done;
+	siginfo_keys = PyTuple_New(SIGINFO_N_MEMBERS);
+	if (siginfo_keys == NULL) goto done;
+	for (i = 0; i < SIGINFO_N_MEMBERS; i++)
+#if PY_MAJOR_VERSION >= 3
+		PyTuple_SET_ITEM(siginfo_keys, i, PyUnicode_InternFromString(siginfo_members[i].name));
+#else
+		PyTuple_SET_ITEM(siginfo_keys, i, PyString_InternFromString(siginfo_members[i].name));
+#endif
+	if (PyErr_Occurred()) goto done;
+	
 #if PY_MAJOR_VERSION >= 3
 	m = PyModule_Create(&signalfdmodule);
 #else
@@ -136,7 +518,13 @@ void initsignalfd_c(void) {
 		/* define signalfd constants */
 		PyModule_AddIntConstant( m, "SFD_CLOEXEC",   SFD_CLOEXEC );
 		PyModule_AddIntConstant( m, "SFD_NONBLOCK",  SFD_NONBLOCK );
+		/* export siginfo type */
+		Py_INCREF(&SiginfoType);
+		PyModule_AddObject( m, "siginfo", (PyObject *)&SiginfoType );
+		/* export siginfo constructor for other C extensions (epoll_c) */
+		PyModule_AddObject( m, "_siginfo_new", PyCapsule_New((void *)_siginfo_new, "linuxfd.signalfd_c._siginfo_new", NULL) );
 	}
+done:
 #if PY_MAJOR_VERSION >= 3
 	return m;
 #endif
@@ -44,6 +44,45 @@ static PyObject * _timerfd_create(PyObject *self, PyObject *args) {
 	return PyLong_FromLong(result);
 };
 
+/* convert integer nanoseconds to struct timespec; integer division is exact,
+   in contrast to splitting a double into seconds and fractional part */
+static void _ns_to_timespec(long long ns, struct timespec *ts) {
+	ts->tv_sec  = (time_t)(ns / 1000000000LL);
+	ts->tv_nsec = (long int)(ns % 1000000000LL);
+}
+
+
+/* convert struct timespec to integer nanoseconds */
+static long long _timespec_to_ns(const struct timespec *ts) {
+	return (long long)ts->tv_sec * 1000000000LL + ts->tv_nsec;
+}
+
+
+/* convert seconds (double) to integer nanoseconds, rounded to nearest */
+static long long _seconds_to_ns(double seconds) {
+	return (long long)(seconds * 1e9 + (seconds < 0 ? -0.5 : 0.5));
+}
+
+
+/* arm/disarm timer with integer nanoseconds; common path of timerfd_settime()
+   and timerfd_settime_ns(); returns -1 and sets errno on error */
+static int _settime_ns(int fd, int flags, long long value, long long interval, struct itimerspec *old_value) {
+	/* variable declarations */
+	int result;
+	struct itimerspec new_value;
+	
+	/* prepare struct itimerspec */
+	_ns_to_timespec(value, &new_value.it_value);
+	_ns_to_timespec(interval, &new_value.it_interval);
+	
+	/* call timerfd_settime() */
+	Py_BEGIN_ALLOW_THREADS
+	result = timerfd_settime(fd, flags, &new_value, old_value);
+	Py_END_ALLOW_THREADS
+	return result;
+}
+
+
 /* Python: timerfd_settime(fd,flags,value,interval) -> value,interval
    C:      int timerfd_settime(int fd, int flags,
                                const struct itimerspec *new_value,
@@ -56,23 +95,14 @@ static PyObject * _timerfd_settime(PyObject *self, PyObject *args) {
 	double value;
 	double interval;
 	struct itimerspec old_value;
-	struct itimerspec new_value;
 	PyObject *resulttuple;
 	
 	/* parse the function's arguments: int fd, int flags, double value, double interval */
 	if (!PyArg_ParseTuple(args, "iidd", &fd, &flags, &value, &interval)) return NULL;
 	
-	/* prepare struct itimerspec */
-	new_value.it_value.tv_sec  = (time_t)value;
-	new_value.it_value.tv_nsec = (long int)( 1e9 * (value - (int)value) );
-	
-	new_value.it_interval.tv_sec  = (time_t)interval;
-	new_value.it_interval.tv_nsec = (long int)( 1e9 * (interval - (int)interval) );
-	
-	/* call timerfd_settime(); catch errors by raising an exception */
-	Py_BEGIN_ALLOW_THREADS
-	result = timerfd_settime(fd, flags, &new_value, &old_value);
-	Py_END_ALLOW_THREADS
+	/* convert seconds once and delegate to the nanoseconds path;
+	   catch errors by raising an exception */
+	result = _settime_ns(fd, flags, _seconds_to_ns(value), _seconds_to_ns(interval), &old_value);
 	if (result == -1) return PyErr_SetFromErrno(PyExc_OSError);
 	
 	/* convert returned struct old_value */
@@ -85,19 +115,49 @@ static PyObject * _timerfd_settime(PyObject *self, PyObject *args) {
 };
 
 
+/* Python: timerfd_settime_ns(fd,flags,value,interval) -> value,interval
+   C:      int timerfd_settime(int fd, int flags,
+                               const struct itimerspec *new_value,
+                               struct itimerspec *old_value); */
+static PyObject * _timerfd_settime_ns(PyObject *self, PyObject *args) {
+	/* variable declarations */
+	int fd;
+	int flags;
+	int result;
+	long long value;
+	long long interval;
+	struct itimerspec old_value;
+	
+	/* parse the function's arguments: int fd, int flags, long long value, long long interval */
+	if (!PyArg_ParseTuple(args, "iiLL", &fd, &flags, &value, &interval)) return NULL;
+	
+	/* call timerfd_settime(); catch errors by raising an exception */
+	result = _settime_ns(fd, flags, value, interval, &old_value);
+	if (result == -1) return PyErr_SetFromErrno(PyExc_OSError);
+	
+	/* everything's fine, return tuple (value,interval) of nanoseconds created from old_value */
+	return Py_BuildValue("(LL)", _timespec_to_ns(&old_value.it_value), _timespec_to_ns(&old_value.it_interval));
+};
+
+
 /* Python: timerfd_gettime(fd) -> value,interval
    C:      int timerfd_gettime(int fd, struct itimerspec *curr_value); */
-static PyObject * _timerfd_gettime(PyObject *self, PyObject *args) {
+static PyObject * _timerfd_gettime(PyObject *self, PyObject *arg) {
 	/* variable declarations */
-	int fd;
+	long fd;
 	int result;
 	double value;
 	double interval;
 	struct itimerspec curr_value;
 	PyObject *resulttuple;
 	
-	/* parse the function's arguments: int fd */
-	if (!PyArg_ParseTuple(args, "i", &fd)) return NULL;
+	/* parse the function's single argument (METH_O, no argument tuple): int fd */
+	fd = PyLong_AsLong(arg);
+	if (fd == -1 && PyErr_Occurred()) return NULL;
+	if (fd < INT_MIN || fd > INT_MAX) {
+		PyErr_SetString(PyExc_OverflowError, "file descriptor out of range");
+		return NULL;
+	}
 	
 	/* call timerfd_gettime(); catch errors by raising an exception */
 	Py_BEGIN_ALLOW_THREADS
@@ -115,16 +175,48 @@ static PyObject * _timerfd_gettime(PyObject *self, PyObject *args) {
 };
 
 
+/* Python: timerfd_gettime_ns(fd) -> value,interval
+   C:      int timerfd_gettime(int fd, struct itimerspec *curr_value); */
+static PyObject * _timerfd_gettime_ns(PyObject *self, PyObject *arg) {
+	/* variable declarations */
+	long fd;
+	int result;
+	struct itimerspec curr_value;
+	
+	/* parse the function's single argument (METH_O, no argument tuple): int fd */
+	fd = PyLong_AsLong(arg);
+	if (fd == -1 && PyErr_Occurred()) return NULL;
+	if (fd < INT_MIN || fd > INT_MAX) {
+		PyErr_SetString(PyExc_OverflowError, "file descriptor out of range");
+		return NULL;
+	}
+	
+	/* call timerfd_gettime(); catch errors by raising an exception */
+	Py_BEGIN_ALLOW_THREADS
+	result = timerfd_gettime(fd, &curr_value);
+	Py_END_ALLOW_THREADS
+	if(result == -1) return PyErr_SetFromErrno(PyExc_OSError);
+	
+	/* everything's fine, return tuple (value,interval) of nanoseconds created from curr_value */
+	return Py_BuildValue("(LL)", _timespec_to_ns(&curr_value.it_value), _timespec_to_ns(&curr_value.it_interval));
+};
+
+
 /* Python: timerfd_read(fd) -> value
    C:      ssize_t read(int fd, void *buf, size_t count); */
-static PyObject * _timerfd_read(PyObject *self, PyObject *args) {
+static PyObject * _timerfd_read(PyObject *self, PyObject *arg) {
 	/* variable declarations */
-	int fd;
+	long fd;
 	uint64_t buffer;
 	ssize_t result;
 	
-	/* parse the function's arguments: int fd */
-	if (!PyArg_ParseTuple(args, "i", &fd)) return NULL;
+	/* parse the function's single argument (METH_O, no argument tuple): int fd */
+	fd = PyLong_AsLong(arg);
+	if (fd == -1 && PyErr_Occurred()) return NULL;
+	if (fd < INT_MIN || fd > INT_MAX) {
+		PyErr_SetString(PyExc_OverflowError, "file descriptor out of range");
+		return NULL;
+	}
 	
 	/* call read(); catch OSErrors */
 	Py_BEGIN_ALLOW_THREADS
@@ -140,16 +232,18 @@ static PyObject * _timerfd_read(PyObject *self, PyObject *args) {
 		return PyErr_SetFromErrno(PyExc_OSError);
 	}
 	
-	return PyLong_FromLong(buffer);
+	return PyLong_FromUnsignedLongLong(buffer);
 }
 
 
 static PyMethodDef methods[] = {
-	{ "timerfd_create",  _timerfd_create,  METH_VARARGS, NULL },
-	{ "timerfd_settime", _timerfd_settime, METH_VARARGS, NULL },
-	{ "timerfd_gettime", _timerfd_gettime, METH_VARARGS, NULL },
-	{ "timerfd_read",    _timerfd_read,    METH_VARARGS, NULL },
-    { NULL,              NULL,     0,            NULL }
+	{ "timerfd_create",     _timerfd_create,     METH_VARARGS, NULL },
+	{ "timerfd_settime",    _timerfd_settime,    METH_VARARGS, NULL },
+	{ "timerfd_settime_ns", _timerfd_settime_ns, METH_VARARGS, NULL },
+	{ "timerfd_gettime",    _timerfd_gettime,    METH_O,       NULL },
+	{ "timerfd_gettime_ns", _timerfd_gettime_ns, METH_O,       NULL },
+	{ "timerfd_read",       _timerfd_read,       METH_O,       NULL },
+    { NULL,                 NULL,                0,            NULL }
 };
 
 #if PY_MAJOR_VERSION >= 3
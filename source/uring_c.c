@@ -0,0 +1,1019 @@
+/* This file is part of linuxfd (Python wrapper for eventfd/signalfd/timerfd)
+Copyright (C) 2026 Frank Abelbeck <frank.abelbeck@googlemail.com>
+
+    linuxfd is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    linuxfd is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with linuxfd.  If not, see <http://www.gnu.org/licenses/>.
+*/
+
+#include <Python.h>
+#include <unistd.h>
+#include <string.h>
+#include <stdint.h> /* definition of uint64_t */
+#include <time.h>
+#include <errno.h>  /* definition of errno */
+#include <signal.h> /* definition of _NSIG */
+#include <poll.h>
+#include <sys/mman.h>
+#include <sys/syscall.h>
+#include <sys/signalfd.h>
+#include <linux/io_uring.h>
+
+/* registered file table updates (Linux 5.5); newer headers declare the opcode
+   as enum member, so own definitions with the stable ABI values are used */
+#define URING_REGISTER_FILES_UPDATE 6
+struct uring_files_update {
+	__u32 offset;
+	__u32 resv;
+	__u64 fds;
+};
+
+/* flags and features newer than some kernel headers */
+#ifndef IORING_SETUP_COOP_TASKRUN
+#define IORING_SETUP_COOP_TASKRUN (1U << 8)
+#endif
+#ifndef IORING_TIMEOUT_MULTISHOT
+#define IORING_TIMEOUT_MULTISHOT (1U << 6)
+#endif
+#ifndef IORING_CQE_F_MORE
+#define IORING_CQE_F_MORE (1U << 1)
+#endif
+#ifndef IORING_SQ_CQ_OVERFLOW
+#define IORING_SQ_CQ_OVERFLOW (1U << 1)
+#endif
+#ifndef IORING_ENTER_SQ_WAIT
+#define IORING_ENTER_SQ_WAIT (1U << 2)
+#endif
+#ifndef IORING_FEAT_EXT_ARG
+#define IORING_FEAT_EXT_ARG (1U << 8)
+#endif
+#ifndef IORING_ENTER_EXT_ARG
+#define IORING_ENTER_EXT_ARG (1U << 3)
+struct io_uring_getevents_arg {
+	__u64 sigmask;
+	__u32 sigmask_sz;
+	__u32 pad;
+	__u64 ts;
+};
+#endif
+
+/* kinds of file descriptors, same values as in epoll_c */
+#define KIND_NONE     0 /* unknown: no read, value is the poll event mask */
+#define KIND_EVENTFD  1 /* eventfd: read counter value (uint64_t) */
+#define KIND_SIGNALFD 2 /* signalfd: read one struct signalfd_siginfo */
+#define KIND_TIMERFD  3 /* timerfd: read number of expirations (uint64_t) */
+
+/* states of a slot (i.e. a registered file descriptor) */
+#define SLOT_FREE     0 /* unused, can be taken by add() */
+#define SLOT_IDLE     1 /* registered, but no operation (after an error) */
+#define SLOT_QUEUED   2 /* registered, operation waits in the pending list */
+#define SLOT_INFLIGHT 3 /* registered, operation submitted to the kernel */
+#define SLOT_CLOSING  4 /* removed while an operation was in flight */
+
+/* user data of completions to be ignored (e.g. results of cancel requests) */
+#define USERDATA_IGNORE UINT64_MAX
+
+/* a registered file descriptor; the kernel writes read results directly into
+   the value buffer, hence each slot is allocated separately and never moved
+   or freed while an operation is in flight */
+struct uring_slot {
+	int fd;
+	int kind;
+	int state;
+	uint8_t op;       /* IORING_OP_READ, IORING_OP_POLL_ADD or IORING_OP_TIMEOUT */
+	uint32_t events;  /* poll mask for files of kind KIND_NONE */
+	uint32_t generation;
+	int fixed;        /* fd is in the ring's registered file table at the slot's index */
+	int unfix;        /* table entry has to be released by the next _ring_prepare() */
+	/* periodic timers (op IORING_OP_TIMEOUT) */
+	int multishot;    /* one timeout operation posts a completion per period */
+	uint64_t interval;
+	struct __kernel_timespec ts; /* period, or next absolute deadline if not multishot */
+	union {
+		uint64_t counter;
+		struct signalfd_siginfo siginfo;
+	} value;
+};
+
+/* siginfo constructor imported from signalfd_c */
+typedef PyObject * (*siginfo_new_func)(const struct signalfd_siginfo *);
+static siginfo_new_func siginfo_new = NULL;
+
+/* Ring object: an io_uring instance with its memory-mapped queues and the
+   table of registered file descriptors */
+typedef struct {
+	PyObject_HEAD
+	int fd;
+	unsigned int features;
+	unsigned int setup_flags;
+	int busy;              /* set while wait() runs without the GIL */
+	struct __kernel_timespec timeout; /* read by the kernel (thread) while wait() runs */
+	/* submission queue */
+	void *sq_ring;
+	size_t sq_ring_size;
+	unsigned int *sq_head;
+	unsigned int *sq_tail;
+	unsigned int *sq_mask;
+	unsigned int *sq_array;
+	unsigned int *sq_flags;
+	unsigned int sq_entries;
+	unsigned int sq_unsubmitted; /* SQEs written but not yet passed to io_uring_enter() */
+	struct io_uring_sqe *sqes;
+	size_t sqes_size;
+	/* completion queue */
+	void *cq_ring;
+	size_t cq_ring_size;
+	unsigned int *cq_head;
+	unsigned int *cq_tail;
+	unsigned int *cq_mask;
+	struct io_uring_cqe *cqes;
+	/* registered file descriptors */
+	struct uring_slot **slots;
+	uint32_t n_slots;
+	uint32_t n_inflight;
+	PyObject *fds;         /* dict mapping fd -> slot index */
+	unsigned int n_files;  /* size of the registered file table; 0 if not supported */
+	/* slot indices waiting for their operation to be submitted */
+	uint32_t *pending;
+	uint32_t n_pending;
+	uint32_t pending_size;
+	/* user data of operations to be cancelled */
+	uint64_t *cancels;
+	uint32_t n_cancels;
+	uint32_t cancels_size;
+} RingObject;
+
+static PyTypeObject RingType;
+
+
+/* thin wrappers around the io_uring syscalls (not wrapped by glibc) */
+static int sys_io_uring_setup(unsigned int entries, struct io_uring_params *params) {
+	return (int)syscall(__NR_io_uring_setup, entries, params);
+}
+
+static int sys_io_uring_enter(int fd, unsigned int to_submit, unsigned int min_complete, unsigned int flags, void *arg, size_t argsz) {
+	return (int)syscall(__NR_io_uring_enter, fd, to_submit, min_complete, flags, arg, argsz);
+}
+
+static int sys_io_uring_register(int fd, unsigned int opcode, void *arg, unsigned int nr_args) {
+	return (int)syscall(__NR_io_uring_register, fd, opcode, arg, nr_args);
+}
+
+
+/* put a file descriptor (or -1 to release the entry) into the registered
+   file table; returns -1 and sets errno on failure */
+static int _ring_update_file(RingObject *ring, uint32_t index, int fd) {
+	struct uring_files_update update;
+	memset(&update, 0, sizeof(update));
+	update.offset = index;
+	update.fds = (uint64_t)(uintptr_t)&fd;
+	return sys_io_uring_register(ring->fd, URING_REGISTER_FILES_UPDATE, &update, 1) == 1 ? 0 : -1;
+}
+
+
+/* append an index to a growing uint32 array; returns -1 if out of memory */
+static int _ring_push_pending(RingObject *ring, uint32_t index) {
+	uint32_t *pending;
+	uint32_t size;
+	if (ring->n_pending == ring->pending_size) {
+		size = ring->pending_size ? 2 * ring->pending_size : 16;
+		pending = PyMem_Realloc(ring->pending, size * sizeof(uint32_t));
+		if (pending == NULL) {
+			PyErr_NoMemory();
+			return -1;
+		}
+		ring->pending = pending;
+		ring->pending_size = size;
+	}
+	ring->pending[ring->n_pending++] = index;
+	return 0;
+}
+
+static int _ring_push_cancel(RingObject *ring, uint64_t userdata) {
+	uint64_t *cancels;
+	uint32_t size;
+	if (ring->n_cancels == ring->cancels_size) {
+		size = ring->cancels_size ? 2 * ring->cancels_size : 16;
+		cancels = PyMem_Realloc(ring->cancels, size * sizeof(uint64_t));
+		if (cancels == NULL) {
+			PyErr_NoMemory();
+			return -1;
+		}
+		ring->cancels = cancels;
+		ring->cancels_size = size;
+	}
+	ring->cancels[ring->n_cancels++] = userdata;
+	return 0;
+}
+
+
+/* flags for io_uring_enter() needed to get written SQEs processed: with a
+   kernel submission thread, a system call is only needed to wake it up after
+   it went to sleep */
+static unsigned int _ring_enter_flags(RingObject *ring) {
+	if (!(ring->setup_flags & IORING_SETUP_SQPOLL)) return 0;
+	/* the tail store has to be visible before the flags are read */
+	__atomic_thread_fence(__ATOMIC_SEQ_CST);
+	return (__atomic_load_n(ring->sq_flags, __ATOMIC_RELAXED) & IORING_SQ_NEED_WAKEUP) ? IORING_ENTER_SQ_WAKEUP : 0;
+}
+
+
+/* pass all written SQEs to the kernel; the GIL may be held or not */
+static int _ring_submit(RingObject *ring) {
+	int result;
+	unsigned int flags;
+	while (ring->sq_unsubmitted > 0) {
+		flags = _ring_enter_flags(ring);
+		if ((ring->setup_flags & IORING_SETUP_SQPOLL) && flags == 0) {
+			/* submission thread is awake and picks up the SQEs by itself */
+			ring->sq_unsubmitted = 0;
+			break;
+		}
+		result = sys_io_uring_enter(ring->fd, ring->sq_unsubmitted, 0, flags, NULL, 0);
+		if (result == -1) {
+			if (errno == EINTR) continue;
+			return -1;
+		}
+		if (result == 0) {
+			/* the kernel found no SQEs left to consume */
+			ring->sq_unsubmitted = 0;
+			break;
+		}
+		ring->sq_unsubmitted -= (unsigned int)result;
+	}
+	return 0;
+}
+
+
+/* get the next free SQE, submitting queued SQEs if the queue is full;
+   returns NULL and sets errno on failure */
+static struct io_uring_sqe * _ring_get_sqe(RingObject *ring) {
+	unsigned int head;
+	unsigned int tail;
+	struct io_uring_sqe *sqe;
+	tail = *ring->sq_tail;
+	head = __atomic_load_n(ring->sq_head, __ATOMIC_ACQUIRE);
+	if (tail - head >= ring->sq_entries) {
+		if (_ring_submit(ring) == -1) return NULL;
+		head = __atomic_load_n(ring->sq_head, __ATOMIC_ACQUIRE);
+		/* submission thread has not yet consumed the queue: wait for it */
+		while ((ring->setup_flags & IORING_SETUP_SQPOLL) && tail - head >= ring->sq_entries) {
+			if (sys_io_uring_enter(ring->fd, 0, 0, IORING_ENTER_SQ_WAIT | _ring_enter_flags(ring), NULL, 0) == -1 && errno != EINTR) return NULL;
+			head = __atomic_load_n(ring->sq_head, __ATOMIC_ACQUIRE);
+		}
+		if (tail - head >= ring->sq_entries) {
+			errno = EBUSY;
+			return NULL;
+		}
+	}
+	sqe = &ring->sqes[tail & *ring->sq_mask];
+	memset(sqe, 0, sizeof(struct io_uring_sqe));
+	return sqe;
+}
+
+/* make an SQE obtained by _ring_get_sqe() visible to the kernel */
+static void _ring_commit_sqe(RingObject *ring, struct io_uring_sqe *sqe) {
+	unsigned int tail;
+	unsigned int index;
+	tail = *ring->sq_tail;
+	index = (unsigned int)(sqe - ring->sqes);
+	ring->sq_array[tail & *ring->sq_mask] = index;
+	__atomic_store_n(ring->sq_tail, tail + 1, __ATOMIC_RELEASE);
+	ring->sq_unsubmitted++;
+}
+
+
+/* user data of a slot's operation: index and generation, so that completions
+   and cancel requests of a former user of a reused slot can be told apart */
+static uint64_t _slot_userdata(struct uring_slot *slot, uint32_t index) {
+	return ((uint64_t)slot->generation << 32) | index;
+}
+
+
+/* turn pending slots and cancel requests into SQEs; returns -1 and sets errno
+   on failure */
+static int _ring_prepare(RingObject *ring) {
+	struct io_uring_sqe *sqe;
+	struct uring_slot *slot;
+	uint32_t index;
+
+	while (ring->n_cancels > 0) {
+		sqe = _ring_get_sqe(ring);
+		if (sqe == NULL) return -1;
+		sqe->opcode = IORING_OP_ASYNC_CANCEL;
+		sqe->fd = -1;
+		sqe->addr = ring->cancels[ring->n_cancels - 1];
+		sqe->user_data = USERDATA_IGNORE;
+		_ring_commit_sqe(ring, sqe);
+		ring->n_cancels--;
+	}
+
+	while (ring->n_pending > 0) {
+		index = ring->pending[ring->n_pending - 1];
+		slot = ring->slots[index];
+		if (slot->unfix) {
+			/* release the registered file of a removed slot */
+			_ring_update_file(ring, index, -1);
+			slot->unfix = 0;
+			slot->fixed = 0;
+		}
+		/* slots removed (or queued twice) in the meantime are skipped */
+		if (slot->state == SLOT_QUEUED) {
+			sqe = _ring_get_sqe(ring);
+			if (sqe == NULL) return -1;
+			sqe->opcode = slot->op;
+			if (slot->op == IORING_OP_TIMEOUT) {
+				/* off = 0: pure timer, not counting other completions */
+				sqe->fd = -1;
+				sqe->addr = (uint64_t)(uintptr_t)&slot->ts;
+				sqe->len = 1;
+				sqe->timeout_flags = slot->multishot ? IORING_TIMEOUT_MULTISHOT : IORING_TIMEOUT_ABS;
+			} else if (slot->fixed) {
+				/* registered file: the kernel skips looking up and
+				   reference-counting the file for each operation */
+				sqe->fd = (int)index;
+				sqe->flags = IOSQE_FIXED_FILE;
+			} else {
+				sqe->fd = slot->fd;
+			}
+			if (slot->op == IORING_OP_POLL_ADD) {
+				sqe->poll32_events = slot->kind == KIND_NONE ? slot->events : POLLIN;
+			} else if (slot->op == IORING_OP_READ) {
+				sqe->addr = (uint64_t)(uintptr_t)&slot->value;
+				sqe->len = slot->kind == KIND_SIGNALFD ? sizeof(struct signalfd_siginfo) : sizeof(uint64_t);
+				sqe->off = (uint64_t)-1; /* read from current position (not seekable anyway) */
+			}
+			sqe->user_data = _slot_userdata(slot, index);
+			_ring_commit_sqe(ring, sqe);
+			slot->state = SLOT_INFLIGHT;
+			ring->n_inflight++;
+		}
+		ring->n_pending--;
+	}
+	return 0;
+}
+
+
+/* queue the next operation of a slot */
+static int _ring_queue(RingObject *ring, struct uring_slot *slot, uint32_t index, uint8_t op) {
+	slot->op = op;
+	slot->state = SLOT_QUEUED;
+	return _ring_push_pending(ring, index);
+}
+
+
+/* take a free slot or append a new one; returns NULL on error */
+static struct uring_slot * _ring_take_slot(RingObject *ring, uint32_t *index) {
+	uint32_t i;
+	struct uring_slot *slot;
+	struct uring_slot **slots;
+	for (i = 0; i < ring->n_slots; i++) {
+		if (ring->slots[i]->state == SLOT_FREE && !ring->slots[i]->unfix) {
+			*index = i;
+			return ring->slots[i];
+		}
+	}
+	slots = PyMem_Realloc(ring->slots, (ring->n_slots + 1) * sizeof(struct uring_slot *));
+	if (slots == NULL) return (struct uring_slot *)PyErr_NoMemory();
+	ring->slots = slots;
+	slot = PyMem_Malloc(sizeof(struct uring_slot));
+	if (slot == NULL) return (struct uring_slot *)PyErr_NoMemory();
+	memset(slot, 0, sizeof(struct uring_slot));
+	*index = ring->n_slots;
+	ring->slots[ring->n_slots++] = slot;
+	return slot;
+}
+
+
+/* Python: ring(entries,sqthreadidle,files) -> ring object
+   C:      int io_uring_setup(u32 entries, struct io_uring_params *p);
+           int io_uring_register(unsigned int fd, unsigned int opcode,
+                                 void *arg, unsigned int nr_args); */
+static PyObject * _ring_new(PyTypeObject *type, PyObject *args, PyObject *kwargs) {
+	/* variable declarations */
+	static char *kwlist[] = { "entries", "sqthreadidle", "files", NULL };
+	unsigned int entries;
+	int sqthreadidle;
+	unsigned int files;
+	unsigned int i;
+	int *table;
+	struct io_uring_params params;
+	RingObject *ring;
+	int fd;
+
+	/* parse the function's arguments: unsigned int entries, int sqthreadidle
+	   (milliseconds; negative: no kernel submission thread), unsigned int
+	   files (size of the registered file table) */
+	entries = 64;
+	sqthreadidle = -1;
+	files = 256;
+	if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|IiI", kwlist, &entries, &sqthreadidle, &files)) return NULL;
+
+	/* create the ring; with a kernel submission thread (Linux 5.11+ for
+	   unprivileged users), SQEs are picked up without any system call; else
+	   cooperative task running saves an interrupt per completion, as
+	   completions are only reaped in io_uring_enter() anyway; kernels older
+	   than 5.19 do not know that flag, so retry without */
+	memset(&params, 0, sizeof(params));
+	if (sqthreadidle >= 0) {
+		params.flags = IORING_SETUP_SQPOLL;
+		params.sq_thread_idle = (unsigned int)sqthreadidle;
+	} else {
+		params.flags = IORING_SETUP_COOP_TASKRUN;
+	}
+	Py_BEGIN_ALLOW_THREADS
+	fd = sys_io_uring_setup(entries, &params);
+	if (fd == -1 && errno == EINVAL && sqthreadidle < 0) {
+		memset(&params, 0, sizeof(params));
+		fd = sys_io_uring_setup(entries, &params);
+	}
+	Py_END_ALLOW_THREADS
+	if (fd == -1) return PyErr_SetFromErrno(PyExc_OSError);
+
+	ring = (RingObject *)type->tp_alloc(type, 0);
+	if (ring == NULL) {
+		close(fd);
+		return NULL;
+	}
+	ring->fd = fd;
+	ring->features = params.features;
+	ring->setup_flags = params.flags;
+	ring->sq_ring = MAP_FAILED;
+	ring->cq_ring = MAP_FAILED;
+	ring->sqes = MAP_FAILED;
+	ring->fds = PyDict_New();
+	if (ring->fds == NULL) goto error;
+
+	/* map submission queue, completion queue (shared with the submission
+	   queue since Linux 5.4) and the array of SQEs */
+	ring->sq_ring_size = params.sq_off.array + params.sq_entries * sizeof(unsigned int);
+	ring->cq_ring_size = params.cq_off.cqes + params.cq_entries * sizeof(struct io_uring_cqe);
+	if (params.features & IORING_FEAT_SINGLE_MMAP) {
+		if (ring->cq_ring_size > ring->sq_ring_size) ring->sq_ring_size = ring->cq_ring_size;
+		ring->cq_ring_size = ring->sq_ring_size;
+	}
+	ring->sq_ring = mmap(NULL, ring->sq_ring_size, PROT_READ|PROT_WRITE, MAP_SHARED|MAP_POPULATE, fd, IORING_OFF_SQ_RING);
+	if (ring->sq_ring == MAP_FAILED) goto oserror;
+	if (params.features & IORING_FEAT_SINGLE_MMAP) {
+		ring->cq_ring = ring->sq_ring;
+	} else {
+		ring->cq_ring = mmap(NULL, ring->cq_ring_size, PROT_READ|PROT_WRITE, MAP_SHARED|MAP_POPULATE, fd, IORING_OFF_CQ_RING);
+		if (ring->cq_ring == MAP_FAILED) goto oserror;
+	}
+	ring->sqes_size = params.sq_entries * sizeof(struct io_uring_sqe);
+	ring->sqes = mmap(NULL, ring->sqes_size, PROT_READ|PROT_WRITE, MAP_SHARED|MAP_POPULATE, fd, IORING_OFF_SQES);
+	if (ring->sqes == MAP_FAILED) goto oserror;
+
+	ring->sq_head    = (unsigned int *)((char *)ring->sq_ring + params.sq_off.head);
+	ring->sq_tail    = (unsigned int *)((char *)ring->sq_ring + params.sq_off.tail);
+	ring->sq_mask    = (unsigned int *)((char *)ring->sq_ring + params.sq_off.ring_mask);
+	ring->sq_array   = (unsigned int *)((char *)ring->sq_ring + params.sq_off.array);
+	ring->sq_flags   = (unsigned int *)((char *)ring->sq_ring + params.sq_off.flags);
+	ring->sq_entries = params.sq_entries;
+	ring->cq_head    = (unsigned int *)((char *)ring->cq_ring + params.cq_off.head);
+	ring->cq_tail    = (unsigned int *)((char *)ring->cq_ring + params.cq_off.tail);
+	ring->cq_mask    = (unsigned int *)((char *)ring->cq_ring + params.cq_off.ring_mask);
+	ring->cqes       = (struct io_uring_cqe *)((char *)ring->cq_ring + params.cq_off.cqes);
+
+	/* register an empty file table; entries are filled by add(); without
+	   support (or if the table does not fit RLIMIT_NOFILE) plain file
+	   descriptors are used */
+	if (files > 0) {
+		table = PyMem_New(int, files);
+		if (table == NULL) {
+			PyErr_NoMemory();
+			goto error;
+		}
+		for (i = 0; i < files; i++) table[i] = -1;
+		if (sys_io_uring_register(fd, IORING_REGISTER_FILES, table, files) == 0) ring->n_files = files;
+		PyMem_Free(table); /* thou shalt always free allocated memory! */
+	}
+	return (PyObject *)ring;
+
+oserror:
+	PyErr_SetFromErrno(PyExc_OSError);
+error:
+	Py_DECREF(ring); /* dealloc unmaps and closes everything set up so far */
+	return NULL;
+}
+
+
+/* cancel all operations, wait for their completion and release the ring;
+   buffers of slots must not be freed before the kernel is done with them */
+static void _ring_release(RingObject *ring) {
+	uint32_t i;
+	unsigned int head;
+	unsigned int tail;
+	struct io_uring_cqe *cqe;
+	struct uring_slot *slot;
+
+	if (ring->fd != -1 && ring->sq_ring != MAP_FAILED && ring->cq_ring != MAP_FAILED && ring->sqes != MAP_FAILED) {
+		ring->n_pending = 0;
+		ring->n_cancels = 0;
+		for (i = 0; i < ring->n_slots; i++) {
+			slot = ring->slots[i];
+			if (slot->state == SLOT_INFLIGHT || slot->state == SLOT_CLOSING) {
+				if (_ring_push_cancel(ring, _slot_userdata(slot, i)) == -1) PyErr_Clear();
+			}
+		}
+		Py_BEGIN_ALLOW_THREADS
+		if (_ring_prepare(ring) == 0 && _ring_submit(ring) == 0) {
+			while (ring->n_inflight > 0) {
+				head = *ring->cq_head;
+				tail = __atomic_load_n(ring->cq_tail, __ATOMIC_ACQUIRE);
+				if (head == tail) {
+					if (sys_io_uring_enter(ring->fd, 0, 1, IORING_ENTER_GETEVENTS, NULL, 0) == -1 && errno != EINTR) break;
+					continue;
+				}
+				for (; head != tail; head++) {
+					cqe = &ring->cqes[head & *ring->cq_mask];
+					if (cqe->user_data != USERDATA_IGNORE && !(cqe->flags & IORING_CQE_F_MORE)) ring->n_inflight--;
+				}
+				__atomic_store_n(ring->cq_head, head, __ATOMIC_RELEASE);
+			}
+		}
+		Py_END_ALLOW_THREADS
+	}
+	if (ring->sqes != MAP_FAILED) munmap(ring->sqes, ring->sqes_size);
+	if (ring->cq_ring != MAP_FAILED && ring->cq_ring != ring->sq_ring) munmap(ring->cq_ring, ring->cq_ring_size);
+	if (ring->sq_ring != MAP_FAILED) munmap(ring->sq_ring, ring->sq_ring_size);
+	ring->sqes = MAP_FAILED;
+	ring->cq_ring = MAP_FAILED;
+	ring->sq_ring = MAP_FAILED;
+	if (ring->fd != -1) close(ring->fd);
+	ring->fd = -1;
+	/* thou shalt always free allocated memory! */
+	for (i = 0; i < ring->n_slots; i++) PyMem_Free(ring->slots[i]);
+	PyMem_Free(ring->slots);
+	PyMem_Free(ring->pending);
+	PyMem_Free(ring->cancels);
+	ring->slots = NULL;
+	ring->pending = NULL;
+	ring->cancels = NULL;
+	ring->n_slots = ring->n_pending = ring->n_cancels = 0;
+	ring->pending_size = ring->cancels_size = 0;
+	ring->n_inflight = 0;
+	if (ring->fds != NULL) PyDict_Clear(ring->fds);
+}
+
+
+static void _ring_dealloc(RingObject *ring) {
+	_ring_release(ring);
+	Py_XDECREF(ring->fds);
+	Py_TYPE(ring)->tp_free((PyObject *)ring);
+}
+
+
+/* Python: ring.close() -> None */
+static PyObject * _ring_close(RingObject *ring, PyObject *unused) {
+	if (ring->busy) {
+		errno = EBUSY;
+		return PyErr_SetFromErrno(PyExc_OSError);
+	}
+	_ring_release(ring);
+	Py_RETURN_NONE;
+}
+
+
+/* Python: ring.fileno() -> int */
+static PyObject * _ring_fileno(RingObject *ring, PyObject *unused) {
+	return PyLong_FromLong(ring->fd);
+}
+
+
+/* Python: ring.add(fd,kind,events) -> None */
+static PyObject * _ring_add(RingObject *ring, PyObject *args) {
+	/* variable declarations */
+	int fd;
+	int kind;
+	unsigned int events;
+	uint32_t index;
+	struct uring_slot *slot;
+	PyObject *key;
+	PyObject *value;
+
+	/* parse the function's arguments: int fd, int kind, unsigned int events */
+	events = POLLIN;
+	if (!PyArg_ParseTuple(args, "ii|I", &fd, &kind, &events)) return NULL;
+	if (ring->fd == -1 || fd < 0) {
+		errno = EBADF;
+		return PyErr_SetFromErrno(PyExc_OSError);
+	}
+	if (kind < KIND_NONE || kind > KIND_TIMERFD) {
+		errno = EINVAL;
+		return PyErr_SetFromErrno(PyExc_OSError);
+	}
+	key = PyLong_FromLong(fd);
+	if (key == NULL) return NULL;
+	if (PyDict_GetItem(ring->fds, key) != NULL) {
+		Py_DECREF(key);
+		errno = EEXIST;
+		return PyErr_SetFromErrno(PyExc_OSError);
+	}
+
+	slot = _ring_take_slot(ring, &index);
+	if (slot == NULL) {
+		Py_DECREF(key);
+		return NULL;
+	}
+	value = PyLong_FromUnsignedLong(index);
+	if (value == NULL || PyDict_SetItem(ring->fds, key, value) == -1) {
+		Py_XDECREF(value);
+		Py_DECREF(key);
+		return NULL;
+	}
+	Py_DECREF(value);
+	Py_DECREF(key);
+	slot->fd = fd;
+	slot->kind = kind;
+	slot->events = events;
+	slot->generation++;
+	slot->fixed = (index < ring->n_files && _ring_update_file(ring, index, fd) == 0);
+	/* files of a known kind are read right away; the kernel waits internally
+	   until they are readable */
+	if (_ring_queue(ring, slot, index, kind == KIND_NONE ? IORING_OP_POLL_ADD : IORING_OP_READ) == -1) {
+		slot->state = SLOT_IDLE; /* keep the slot consistent with the dict */
+		return NULL;
+	}
+	Py_RETURN_NONE;
+}
+
+
+/* Python: ring.addtimer(interval) -> key
+   interval in nanoseconds; completions are reported as (KIND_TIMERFD,key,count)
+   with a negative key that can be passed to remove() */
+static PyObject * _ring_addtimer(RingObject *ring, PyObject *arg) {
+	/* variable declarations */
+	unsigned long long interval;
+	uint32_t index;
+	struct uring_slot *slot;
+	PyObject *key;
+	PyObject *value;
+
+	interval = PyLong_AsUnsignedLongLong(arg);
+	if (interval == (unsigned long long)-1 && PyErr_Occurred()) return NULL;
+	if (interval == 0) {
+		errno = EINVAL;
+		return PyErr_SetFromErrno(PyExc_OSError);
+	}
+	if (ring->fd == -1) {
+		errno = EBADF;
+		return PyErr_SetFromErrno(PyExc_OSError);
+	}
+	slot = _ring_take_slot(ring, &index);
+	if (slot == NULL) return NULL;
+	key = PyLong_FromLong(-1 - (long)index);
+	value = PyLong_FromUnsignedLong(index);
+	if (key == NULL || value == NULL || PyDict_SetItem(ring->fds, key, value) == -1) {
+		Py_XDECREF(key);
+		Py_XDECREF(value);
+		return NULL;
+	}
+	Py_DECREF(value);
+	slot->fd = -1 - (int)index;
+	slot->kind = KIND_TIMERFD;
+	slot->generation++;
+	slot->fixed = 0;
+	/* try a multishot timeout first (Linux 6.4+); an older kernel rejects
+	   it with EINVAL, then each period is a single absolute timeout */
+	slot->multishot = 1;
+	slot->interval = interval;
+	slot->ts.tv_sec  = (long long)(interval / 1000000000ULL);
+	slot->ts.tv_nsec = (long long)(interval % 1000000000ULL);
+	if (_ring_queue(ring, slot, index, IORING_OP_TIMEOUT) == -1) {
+		slot->state = SLOT_IDLE;
+		Py_DECREF(key);
+		return NULL;
+	}
+	return key;
+}
+
+
+/* Python: ring.remove(fd) -> None */
+static PyObject * _ring_remove(RingObject *ring, PyObject *arg) {
+	/* variable declarations */
+	PyObject *value;
+	uint32_t index;
+	struct uring_slot *slot;
+
+	value = PyDict_GetItem(ring->fds, arg); /* borrowed reference */
+	if (value == NULL) {
+		if (PyErr_Occurred()) return NULL;
+		errno = ENOENT;
+		return PyErr_SetFromErrno(PyExc_OSError);
+	}
+	index = (uint32_t)PyLong_AsUnsignedLong(value);
+	slot = ring->slots[index];
+	if (slot->state == SLOT_INFLIGHT) {
+		/* the kernel might still write into the slot's buffer: cancel the
+		   operation and keep the slot until its completion arrives */
+		if (_ring_push_cancel(ring, _slot_userdata(slot, index)) == -1) return NULL;
+		slot->state = SLOT_CLOSING;
+	} else {
+		slot->state = SLOT_FREE;
+	}
+	/* release the registered file: an operation still in flight keeps its
+	   own reference, but the file must not be kept open after the caller
+	   closed it; like submissions, this is done by _ring_prepare() */
+	if (slot->fixed) {
+		if (_ring_push_pending(ring, index) == -1) return NULL;
+		slot->unfix = 1;
+	}
+	slot->fd = -1;
+	if (PyDict_DelItem(ring->fds, arg) == -1) return NULL;
+	/* submit the cancel request and release the registered file right away,
+	   so that a value written to the file from now on is left there; while
+	   another thread waits in wait(), the ring belongs to that thread: the
+	   work is then done by the next wait() and the caller has to wake the
+	   waiting thread up; a failed submission is retried by the next wait()
+	   as well */
+	if (!ring->busy && (ring->n_cancels > 0 || ring->n_pending > 0) && _ring_prepare(ring) == 0) _ring_submit(ring);
+	Py_RETURN_NONE;
+}
+
+
+/* build the (kind,fd,value) tuple for a completion and queue the slot's next
+   operation; returns 0 if there is nothing to report, -1 on error */
+static int _ring_complete(RingObject *ring, struct io_uring_cqe *cqe, PyObject *data) {
+	/* variable declarations */
+	uint32_t index;
+	struct uring_slot *slot;
+	PyObject *value;
+	PyObject *item;
+	int32_t res;
+	int more;
+	uint64_t count;
+	uint64_t late;
+	struct timespec now;
+
+	if (cqe->user_data == USERDATA_IGNORE) return 0;
+	index = (uint32_t)(cqe->user_data & 0xffffffffU);
+	if (index >= ring->n_slots) return 0;
+	slot = ring->slots[index];
+	if (slot->generation != (uint32_t)(cqe->user_data >> 32)) return 0;
+	/* a multishot operation stays in flight as long as IORING_CQE_F_MORE is set */
+	more = (cqe->flags & IORING_CQE_F_MORE) != 0;
+	if (!more) ring->n_inflight--;
+	if (slot->state == SLOT_CLOSING) {
+		if (!more) slot->state = SLOT_FREE;
+		return 0;
+	}
+	res = cqe->res;
+	if (!more) slot->state = SLOT_IDLE;
+
+	if (slot->op == IORING_OP_TIMEOUT && res == -ETIME) {
+		/* timer expired: the multishot timeout re-arms itself; otherwise
+		   count missed periods like timerfd and arm the next deadline */
+		count = 1;
+		if (!slot->multishot) {
+			clock_gettime(CLOCK_MONOTONIC, &now);
+			late = (uint64_t)(now.tv_sec - slot->ts.tv_sec) * 1000000000ULL + (uint64_t)now.tv_nsec - (uint64_t)slot->ts.tv_nsec;
+			if ((int64_t)late > 0) count += late / slot->interval;
+			slot->ts.tv_sec  += (long long)(count * slot->interval / 1000000000ULL);
+			slot->ts.tv_nsec += (long long)(count * slot->interval % 1000000000ULL);
+			if (slot->ts.tv_nsec >= 1000000000LL) {
+				slot->ts.tv_sec++;
+				slot->ts.tv_nsec -= 1000000000LL;
+			}
+		}
+		if (!more && _ring_queue(ring, slot, index, IORING_OP_TIMEOUT) == -1) return -1;
+		item = Py_BuildValue("(iiK)", slot->kind, slot->fd, (unsigned long long)count);
+		if (item == NULL || PyList_Append(data, item) == -1) {
+			Py_XDECREF(item);
+			return -1;
+		}
+		Py_DECREF(item);
+		return 1;
+	}
+	if (slot->op == IORING_OP_TIMEOUT && res == -EINVAL && slot->multishot) {
+		/* Linux < 6.4: no multishot timeouts, use absolute single ones */
+		slot->multishot = 0;
+		clock_gettime(CLOCK_MONOTONIC, &now);
+		slot->ts.tv_sec  = now.tv_sec + (long long)(slot->interval / 1000000000ULL);
+		slot->ts.tv_nsec = now.tv_nsec + (long long)(slot->interval % 1000000000ULL);
+		if (slot->ts.tv_nsec >= 1000000000LL) {
+			slot->ts.tv_sec++;
+			slot->ts.tv_nsec -= 1000000000LL;
+		}
+		return _ring_queue(ring, slot, index, IORING_OP_TIMEOUT);
+	}
+
+	if (slot->op == IORING_OP_READ && (res == -EAGAIN || res == -EWOULDBLOCK)) {
+		/* kernel could not wait for a readable file itself (older kernels with
+		   non-blocking files): poll first, then read again */
+		return _ring_queue(ring, slot, index, IORING_OP_POLL_ADD);
+	}
+	if (slot->op == IORING_OP_POLL_ADD && res >= 0 && slot->kind != KIND_NONE) {
+		return _ring_queue(ring, slot, index, IORING_OP_READ);
+	}
+	if (res >= 0 && slot->op == IORING_OP_READ && (size_t)res != (slot->kind == KIND_SIGNALFD ? sizeof(struct signalfd_siginfo) : sizeof(uint64_t))) {
+		res = -EIO;
+	}
+
+	if (res < 0) {
+		/* operation failed: report the error instead of a value; the slot
+		   stays idle until the file is removed */
+		value = PyObject_CallFunction(PyExc_OSError, "is", -res, strerror(-res));
+	} else {
+		switch (slot->kind) {
+			case KIND_EVENTFD:
+			case KIND_TIMERFD:
+				value = PyLong_FromUnsignedLongLong(slot->value.counter);
+				break;
+			case KIND_SIGNALFD:
+				value = siginfo_new(&slot->value.siginfo);
+				break;
+			default:
+				value = PyLong_FromUnsignedLong((unsigned long)res);
+		}
+		if (_ring_queue(ring, slot, index, slot->op) == -1) {
+			Py_XDECREF(value);
+			return -1;
+		}
+	}
+	item = (value == NULL) ? NULL : Py_BuildValue("(iiN)", slot->kind, slot->fd, value);
+	if (item == NULL || PyList_Append(data, item) == -1) {
+		Py_XDECREF(item);
+		return -1;
+	}
+	Py_DECREF(item);
+	return 1;
+}
+
+
+/* Python: ring.wait(timeout,maxevents) -> [(kind,fd,value),...]
+   C:      int io_uring_enter(unsigned int fd, unsigned int to_submit,
+                              unsigned int min_complete, unsigned int flags,
+                              const void *arg, size_t argsz); */
+static PyObject * _ring_wait(RingObject *ring, PyObject *args) {
+	/* variable declarations */
+	int timeout;
+	int maxevents;
+	int result;
+	int error;
+	int n_events;
+	unsigned int min_complete;
+	unsigned int flags;
+	unsigned int head;
+	unsigned int tail;
+	struct io_uring_getevents_arg arg;
+	struct io_uring_sqe *sqe;
+	PyObject *data;
+
+	/* parse the function's arguments: int timeout (milliseconds, negative: infinite), int maxevents */
+	if (!PyArg_ParseTuple(args, "ii", &timeout, &maxevents)) return NULL;
+	if (maxevents < 1) maxevents = 1;
+	if (ring->fd == -1) {
+		errno = EBADF;
+		return PyErr_SetFromErrno(PyExc_OSError);
+	}
+	if (ring->busy) {
+		errno = EBUSY;
+		return PyErr_SetFromErrno(PyExc_OSError);
+	}
+
+	/* make sure the siginfo constructor is available */
+	if (siginfo_new == NULL) {
+		siginfo_new = (siginfo_new_func)PyCapsule_Import("linuxfd.signalfd_c._siginfo_new", 0);
+		if (siginfo_new == NULL) return NULL;
+	}
+
+	/* turn queued operations into SQEs, submit them and wait for at least one
+	   completion in a single io_uring_enter() call */
+	if (_ring_prepare(ring) == -1) return PyErr_SetFromErrno(PyExc_OSError);
+	head = *ring->cq_head;
+	tail = __atomic_load_n(ring->cq_tail, __ATOMIC_ACQUIRE);
+	min_complete = (head == tail && timeout != 0) ? 1 : 0;
+	flags = IORING_ENTER_GETEVENTS;
+	memset(&arg, 0, sizeof(arg));
+	if (min_complete && timeout > 0) {
+		ring->timeout.tv_sec  = timeout / 1000;
+		ring->timeout.tv_nsec = (timeout % 1000) * 1000000L;
+		if (ring->features & IORING_FEAT_EXT_ARG) {
+			arg.sigmask_sz = _NSIG / 8;
+			arg.ts = (uint64_t)(uintptr_t)&ring->timeout;
+			flags |= IORING_ENTER_EXT_ARG;
+		} else {
+			/* Linux < 5.11: add a timeout operation ending after the first
+			   completion of another operation or after the time elapsed */
+			sqe = _ring_get_sqe(ring);
+			if (sqe == NULL) return PyErr_SetFromErrno(PyExc_OSError);
+			sqe->opcode = IORING_OP_TIMEOUT;
+			sqe->fd = -1;
+			sqe->addr = (uint64_t)(uintptr_t)&ring->timeout;
+			sqe->len = 1;
+			sqe->off = 1;
+			sqe->user_data = USERDATA_IGNORE;
+			_ring_commit_sqe(ring, sqe);
+		}
+	}
+	flags |= _ring_enter_flags(ring);
+	if ((ring->setup_flags & IORING_SETUP_SQPOLL) && min_complete == 0 && flags == IORING_ENTER_GETEVENTS
+			&& !(__atomic_load_n(ring->sq_flags, __ATOMIC_RELAXED) & IORING_SQ_CQ_OVERFLOW)) {
+		/* fast path: the submission thread is awake and completions are
+		   already there, no system call at all */
+		result = (int)ring->sq_unsubmitted;
+		error = 0;
+	} else {
+		ring->busy = 1;
+		Py_BEGIN_ALLOW_THREADS
+		result = sys_io_uring_enter(ring->fd, ring->sq_unsubmitted, min_complete, flags,
+			(flags & IORING_ENTER_EXT_ARG) ? (void *)&arg : NULL,
+			(flags & IORING_ENTER_EXT_ARG) ? sizeof(arg) : 0);
+		error = errno;
+		Py_END_ALLOW_THREADS
+		ring->busy = 0;
+	}
+	if (result >= 0) {
+		ring->sq_unsubmitted -= (unsigned int)result;
+	} else if (error != ETIME && error != EBUSY) {
+		/* EBUSY: completion queue overflowed, reap what is there */
+		errno = error;
+		return PyErr_SetFromErrno(PyExc_OSError);
+	}
+
+	/* reap up to maxevents completions; remaining ones are reaped by the next
+	   call without waiting */
+	data = PyList_New(0);
+	if (data == NULL) return NULL;
+	n_events = 0;
+	head = *ring->cq_head;
+	tail = __atomic_load_n(ring->cq_tail, __ATOMIC_ACQUIRE);
+	while (head != tail && n_events < maxevents) {
+		result = _ring_complete(ring, &ring->cqes[head & *ring->cq_mask], data);
+		head++;
+		if (result == -1) {
+			__atomic_store_n(ring->cq_head, head, __ATOMIC_RELEASE);
+			Py_DECREF(data);
+			return NULL;
+		}
+		n_events += result;
+	}
+	__atomic_store_n(ring->cq_head, head, __ATOMIC_RELEASE);
+	return data;
+}
+
+
+static PyMethodDef ring_methods[] = {
+	{ "add",      (PyCFunction)_ring_add,      METH_VARARGS, NULL },
+	{ "addtimer", (PyCFunction)_ring_addtimer, METH_O,       NULL },
+	{ "remove",   (PyCFunction)_ring_remove,   METH_O,       NULL },
+	{ "wait",     (PyCFunction)_ring_wait,     METH_VARARGS, NULL },
+	{ "close",    (PyCFunction)_ring_close,    METH_NOARGS,  NULL },
+	{ "fileno",   (PyCFunction)_ring_fileno,   METH_NOARGS,  NULL },
+	{ NULL,       NULL,                        0,            NULL }
+};
+
+static PyTypeObject RingType = {
+	PyVarObject_HEAD_INIT(NULL, 0)
+	.tp_name        = "linuxfd.uring_c.ring",
+	.tp_basicsize   = sizeof(RingObject),
+	.tp_dealloc     = (destructor)_ring_dealloc,
+	.tp_flags       = Py_TPFLAGS_DEFAULT,
+	.tp_doc         = "An io_uring instance reading registered files.",
+	.tp_methods     = ring_methods,
+	.tp_new         = _ring_new,
+};
+
+
+static PyMethodDef methods[] = {
+    { NULL, NULL, 0, NULL }
+};
+
+#if PY_MAJOR_VERSION >= 3
+static struct PyModuleDef uringmodule = { PyModuleDef_HEAD_INIT, "uring_c", NULL, -1, methods };
+#endif
+
+#if PY_MAJOR_VERSION >= 3
+PyMODINIT_FUNC PyInit_uring_c(void) {
+#else
+void inituring_c(void) {
+#endif
+	PyObject *m;
+
+	m = NULL;
+	if (PyType_Ready(&RingType) < 0) goto done;
+#if PY_MAJOR_VERSION >= 3
+	m = PyModule_Create(&uringmodule);
+#else
+	m = Py_InitModule("uring_c",methods);
+#endif
+	if (m != NULL) {
+		/* export ring type */
+		Py_INCREF(&RingType);
+		PyModule_AddObject( m, "ring", (PyObject *)&RingType );
+	}
+done:
+#if PY_MAJOR_VERSION >= 3
+	return m;
+#endif
+}